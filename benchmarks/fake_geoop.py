@@ -0,0 +1,326 @@
+# benchmarks/fake_geoop.py
+# A local stand-in for GeoOp that serves the login form, job list, job pages
+# and attachments with the same markup the page objects and process_job_page
+# select on, so the scraper can be measured without touching production.
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SESSION_COOKIE = "geoop_bench_session"
+
+# Just enough of AngularJS for utils.image_wait.wait_for_angular: an injector
+# whose $http.pendingRequests tracks the lazy-load XHRs below.
+ANGULAR_SHIM = """
+window.angular = (function () {
+    var http = {pendingRequests: []};
+    var injector = {get: function (name) { return name === '$http' ? http : {flush: function () {}}; }};
+    return {element: function () { return {injector: function () { return injector; }}; }, $http: http};
+})();
+"""
+
+LAZY_LOAD_JS = """
+var loading = false;
+function loadMoreNotes() {
+    var table = document.getElementById('noteTable');
+    var next = parseInt(table.getAttribute('data-next'), 10);
+    var total = parseInt(table.getAttribute('data-total'), 10);
+    if (loading || next >= total) { return; }
+    loading = true;
+    var request = new XMLHttpRequest();
+    angular.$http.pendingRequests.push(request);
+    request.open('GET', '/api/notes/' + table.getAttribute('data-job') + '?offset=' + next);
+    request.onload = function () {
+        var data = JSON.parse(request.responseText);
+        table.tBodies[0].insertAdjacentHTML('beforeend', data.html);
+        table.setAttribute('data-next', data.next);
+        angular.$http.pendingRequests.splice(angular.$http.pendingRequests.indexOf(request), 1);
+        loading = false;
+    };
+    request.send();
+}
+window.addEventListener('scroll', function () {
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 50) { loadMoreNotes(); }
+});
+function showNotes() {
+    document.getElementById('notes').style.display = 'block';
+    return false;
+}
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>GeoOp Login</title></head><body>
+<form onsubmit="return false;">
+  <input id="loginname" name="loginname">
+  <input id="geoop-password" type="password" name="password">
+  <button id="loginID" type="button" onclick="document.cookie='{cookie}=ok; path=/'; location.href='/jobs';">Log in</button>
+</form>
+</body></html>"""
+
+JOB_LIST_PAGE = """<!DOCTYPE html>
+<html><head><title>Jobs</title></head><body>
+<div class="job-list">{links}</div>
+{next_button}
+</body></html>"""
+
+JOB_PAGE = """<!DOCTYPE html>
+<html><head><title>Job #{job_id}</title><script>{angular}</script></head><body>
+<ul class="tabs">
+  <li id="joblink"><a href="#job">Job</a></li>
+  <li id="noteslink"><a href="#notes" onclick="return showNotes();">Notes &amp; Documents</a></li>
+</ul>
+<div id="job">
+  <span data-ng-show="job.id">Job #{job_id}</span>
+  <a id="job_client_link" href="#">{client}</a>
+  <div class="job-edit-details-limit">Job Title: {service}</div>
+  <div data-ng-hide="visits | isEmpty">{visit}</div>
+</div>
+<div id="notes" style="display:none">
+  <table id="noteTable" data-job="{job_id}" data-next="{rendered}" data-total="{total}">
+    <tbody>{rows}</tbody>
+  </table>
+  <div style="height: 1200px"></div>
+</div>
+<script>{lazy_load}</script>
+</body></html>"""
+
+ROW_DATE = "{day:02d} Mar 2024 {hour:02d}:{minute:02d} am"
+
+# 1x1 transparent PNG used for every thumbnail
+THUMBNAIL = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)
+
+
+class FakeGeoOp:
+    """
+    Serves a fake GeoOp on localhost. Every job has the same number of note
+    rows; rows cycle through photo, PDF and text-note kinds. lazy_batch > 0
+    renders only that many rows up front and loads the rest over XHR as the
+    page is scrolled. latency_ms delays every response and error_rate makes
+    that fraction of attachment requests fail with a 503.
+    """
+
+    def __init__(self, jobs=10, rows=20, attachment_bytes=200_000, latency_ms=0,
+                 error_rate=0.0, lazy_batch=0, page_size=25, seed=1):
+        self.jobs = jobs
+        self.rows = rows
+        self.attachment_bytes = attachment_bytes
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.lazy_batch = lazy_batch
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.bytes_served = 0
+        self._stats_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self):
+        return f"{self.base_url}/console.php"
+
+    @property
+    def jobs_url(self):
+        return f"{self.base_url}/jobs"
+
+    def job_ids(self):
+        return [1000 + n for n in range(self.jobs)]
+
+    def job_urls(self):
+        return [f"{self.jobs_url}/{job_id}" for job_id in self.job_ids()]
+
+    def start(self, host="127.0.0.1", port=0):
+        fake = self
+
+        class Handler(FakeGeoOpHandler):
+            server_state = fake
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, size):
+        with self._stats_lock:
+            self.requests += 1
+            self.bytes_served += size
+
+    def should_fail(self):
+        with self._stats_lock:
+            return self.random.random() < self.error_rate
+
+    # ---- content ----
+
+    def attachment(self, job_id, index):
+        """Deterministic body for one attachment, so its ETag is stable across runs."""
+        seed = f"{job_id}-{index}-".encode()
+        return (seed * (self.attachment_bytes // len(seed) + 1))[:self.attachment_bytes]
+
+    def attachment_type(self, index):
+        return "application/pdf" if index % 5 == 3 else "image/jpeg"
+
+    def render_row(self, job_id, index):
+        date = ROW_DATE.format(day=1 + index % 28, hour=1 + index % 12, minute=index % 60)
+        size_kb = self.attachment_bytes / 1024
+        kind = index % 5
+        if kind == 4:
+            thumb = ""
+            description = f"Technician note {index} for job {job_id}: filters swapped and checked."
+        else:
+            url = f"{self.base_url}/files/{job_id}/{index}?signature={index * 7919}"
+            if kind == 3:
+                thumb = f'<a data-ng-href="{url}" href="{url}">report_{index}.pdf</a>'
+                name = f"report_{index}.pdf"
+            else:
+                thumb = f'<img src="/thumb.png" data-geo-image-modal-url="{url}">'
+                name = f"photo_{index}.jpg"
+            description = f'<div class="file-description ng-binding">{name} <span>({size_kb:.1f} KB)</span></div>'
+        return (
+            '<tr class="message-attachment-list-item ng-scope">'
+            f'<td class="ng-binding">{date}</td>'
+            f'<td class="attachment-thumb">{thumb}</td>'
+            f'<td class="note-description ng-binding">{description}</td>'
+            '</tr>'
+        )
+
+    def render_rows(self, job_id, start, stop):
+        return "".join(self.render_row(job_id, index) for index in range(start, min(stop, self.rows)))
+
+    def render_job(self, job_id):
+        rendered = self.lazy_batch if self.lazy_batch else self.rows
+        return JOB_PAGE.format(
+            job_id=job_id,
+            client=f"Client {job_id % 7} - Site {job_id}",
+            service="Swap filters",
+            visit="12 Mar 10:00 - 11:00",
+            rows=self.render_rows(job_id, 0, rendered),
+            rendered=min(rendered, self.rows),
+            total=self.rows,
+            angular=ANGULAR_SHIM,
+            lazy_load=LAZY_LOAD_JS,
+        )
+
+    def render_job_list(self, page):
+        ids = self.job_ids()[(page - 1) * self.page_size:page * self.page_size]
+        links = "".join(
+            f'<div><a class="job-column-link" href="/jobs/{job_id}">Client {job_id % 7}</a></div>' for job_id in ids
+        )
+        next_button = ""
+        if page * self.page_size < self.jobs:
+            next_button = (
+                f'<button aria-label="Go to next page" '
+                f'onclick="location.href=\'/jobs?page={page + 1}\'">Next</button>'
+            )
+        return JOB_LIST_PAGE.format(links=links, next_button=next_button)
+
+
+class FakeGeoOpHandler(BaseHTTPRequestHandler):
+    server_state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        state = self.server_state
+        if state.latency_ms:
+            time.sleep(state.latency_ms / 1000)
+
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        path = parts.path
+
+        if path == "/console.php":
+            return self._send(200, LOGIN_PAGE.format(cookie=SESSION_COOKIE))
+        if path == "/thumb.png":
+            return self._send(200, THUMBNAIL, "image/png")
+        # Attachment links are signed, so like the real file host they don't need the session cookie
+        match = re.fullmatch(r"/files/(\d+)/(\d+)", path)
+        if match:
+            return self._send_attachment(int(match.group(1)), int(match.group(2)))
+        if not self._logged_in():
+            return self._send(200, LOGIN_PAGE.format(cookie=SESSION_COOKIE))
+
+        if path == "/jobs":
+            page = int(query.get("page", ["1"])[0])
+            return self._send(200, state.render_job_list(page))
+
+        match = re.fullmatch(r"/jobs/(\d+)", path)
+        if match:
+            return self._send(200, state.render_job(int(match.group(1))))
+
+        match = re.fullmatch(r"/api/notes/(\d+)", path)
+        if match:
+            start = int(query.get("offset", ["0"])[0])
+            stop = start + (state.lazy_batch or state.rows)
+            body = json.dumps({
+                "html": state.render_rows(int(match.group(1)), start, stop),
+                "next": min(stop, state.rows),
+            })
+            return self._send(200, body, "application/json")
+
+        self._send(404, "Not found")
+
+    def _logged_in(self):
+        return f"{SESSION_COOKIE}=" in self.headers.get("Cookie", "")
+
+    def _send_attachment(self, job_id, index):
+        state = self.server_state
+        if state.should_fail():
+            self.send_response(503)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            state.count(0)
+            return
+
+        body = state.attachment(job_id, index)
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        start, status = 0, 200
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", etag) == etag:
+            start, status = int(match.group(1)), 206
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        self.send_response(status)
+        self.send_header("Content-Type", state.attachment_type(index))
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(body[start:])
+        state.count(len(body) - start)
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server_state.count(len(body))
@@ -0,0 +1,269 @@
+# benchmarks/run_benchmark.py
+# Runs the scraper against the local fake GeoOp and reports throughput,
+# latency, WebDriver round trips, download rate and memory. Results can be
+# saved as JSON and two runs compared to catch regressions.
+#
+#   python -m benchmarks.run_benchmark --jobs 20 --rows 40 --output base.json
+#   python -m benchmarks.run_benchmark --mode http --output http.json
+#   python -m benchmarks.run_benchmark --compare base.json new.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import config_geoop
+import scraper
+from benchmarks.fake_geoop import FakeGeoOp, SESSION_COOKIE
+from utils.http_session import load_session, fetch_job
+from utils.chrome_profile import browser_rss_mb
+from utils.metrics import JobMetrics, percentile
+
+# Metric name -> True if a larger value is better
+METRICS = {
+    "jobs_per_minute": True,
+    "latency_p50_s": False,
+    "latency_p95_s": False,
+    "webdriver_calls_per_job": False,
+    "page_load_p50_s": False,
+    "peak_browser_rss_mb": False,
+    "bytes_per_second": True,
+    "peak_rss_mb": False,
+    "peak_child_rss_mb": False,
+}
+
+
+def peak_rss_mb(who):
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(who).ru_maxrss / scale, 1)
+
+
+def folder_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+# Files under output/ that aren't downloaded attachments
+NOT_ATTACHMENTS = (".txt", ".json", ".db", ".db-wal", ".db-shm", ".part")
+EXTENSIONS = {"application/pdf": (".pdf",), "image/jpeg": (".jpg", ".jpeg")}
+
+
+def verify_attachments(fake, folder):
+    """
+    Check every downloaded attachment is the body the fake served for it, with
+    the extension of its Content-Type. A login page or error body saved in
+    place of a file would otherwise count as a fast, successful download.
+    Returns a list of problems.
+    """
+    problems = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith(NOT_ATTACHMENTS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                body = f.read()
+            # Bodies start with "<job id>-<row index>-", see FakeGeoOp.attachment()
+            match = re.match(rb"(\d+)-(\d+)-", body)
+            if len(body) != fake.attachment_bytes or not match:
+                problems.append(f"{path}: {len(body)} bytes, not a {fake.attachment_bytes}-byte attachment")
+                continue
+            job_id, index = int(match.group(1)), int(match.group(2))
+            if body != fake.attachment(job_id, index):
+                problems.append(f"{path}: body differs from attachment {index} of job {job_id}")
+            content_type = fake.attachment_type(index)
+            if not name.lower().endswith(EXTENSIONS[content_type]):
+                problems.append(f"{path}: served as {content_type}")
+    return problems
+
+
+def run_browser_jobs(fake, downloader, quiet):
+    # create_driver() counts WebDriver commands in driver.command_count
+    driver = scraper.create_driver()
+    with quiet_output(quiet):
+        scraper.login(driver, scraper.create_sessions())
+
+    latencies, calls, page_loads, errors = [], [], [], 0
+    peak_rss = None
+    for url in fake.job_urls():
+        before = driver.command_count
+        metrics = JobMetrics(url, driver)
+        start = time.monotonic()
+        try:
+            with quiet_output(quiet):
+                scraper.report_result(scraper.process_job_page(driver, url, downloader, metrics=metrics))
+        except Exception as e:
+            errors += 1
+            print(f"⚠️ {url}: {e}")
+        latencies.append(time.monotonic() - start)
+        calls.append(driver.command_count - before)
+        page_loads.append(metrics.phases.get("page_load", 0.0))
+        rss = browser_rss_mb(driver)
+        if rss is not None:
+            peak_rss = max(peak_rss or 0, rss)
+    driver.quit()
+    return latencies, calls, errors, page_loads, peak_rss
+
+
+def run_http_jobs(fake, downloader, quiet):
+    cookie = {"name": SESSION_COOKIE, "value": "ok", "domain": "127.0.0.1", "path": "/"}
+    with open(scraper.COOKIES_FILE, "w") as f:
+        json.dump([cookie], f)
+    session = load_session(scraper.COOKIES_FILE)
+
+    latencies, errors = [], 0
+    for url in fake.job_urls():
+        start = time.monotonic()
+        try:
+            with quiet_output(quiet):
+                scraper.report_result(scraper.save_job(fetch_job(session, url), downloader))
+        except Exception as e:
+            errors += 1
+            print(f"⚠️ {url}: {e}")
+        latencies.append(time.monotonic() - start)
+    return latencies, [0] * len(latencies), errors, [], None
+
+
+def quiet_output(quiet):
+    return contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+
+def run(args):
+    fake = FakeGeoOp(
+        jobs=args.jobs,
+        rows=args.rows,
+        attachment_bytes=args.attachment_kb * 1024,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        lazy_batch=args.lazy_batch,
+    ).start()
+    config_geoop.LOGIN_URL = fake.login_url
+    config_geoop.JOBS_URL = fake.jobs_url
+    config_geoop.LEAN_BROWSER = not args.full_browser
+
+    # The scraper writes output/ and cookies.json relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="geoop-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    downloader = scraper.create_downloader()
+    try:
+        print(f"🏁 Benchmarking {args.jobs} jobs x {args.rows} rows ({args.mode} mode) in {workdir}")
+        start = time.monotonic()
+        if args.mode == "browser":
+            latencies, calls, errors, page_loads, peak_rss = run_browser_jobs(fake, downloader, not args.verbose)
+        else:
+            latencies, calls, errors, page_loads, peak_rss = run_http_jobs(fake, downloader, not args.verbose)
+        elapsed = time.monotonic() - start
+        downloaded = folder_size("output")
+        bad_attachments = verify_attachments(fake, "output")
+    finally:
+        downloader.close()
+        os.chdir(cwd)
+        fake.stop()
+
+    return {
+        "config": {key: getattr(args, key) for key in (
+            "mode", "jobs", "rows", "attachment_kb", "latency_ms", "error_rate", "lazy_batch", "full_browser"
+        )},
+        "jobs": len(latencies),
+        "errors": errors,
+        "bad_attachments": len(bad_attachments),
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_minute": round(len(latencies) / elapsed * 60, 2),
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "webdriver_calls_per_job": round(sum(calls) / max(len(calls), 1), 1),
+        "page_load_p50_s": round(percentile(page_loads, 50), 3) if page_loads else None,
+        "peak_browser_rss_mb": peak_rss,
+        "bytes_downloaded": downloaded,
+        "bytes_per_second": round(downloaded / elapsed),
+        "server_requests": fake.requests,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "peak_child_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }, bad_attachments
+
+
+def print_report(results):
+    for key, value in results.items():
+        if key != "config":
+            print(f"  {key:<26}{value}")
+
+
+def compare(base_file, new_file, threshold):
+    """Print the change in every metric; returns True if any got worse by more than threshold."""
+    with open(base_file) as f:
+        base = json.load(f)
+    with open(new_file) as f:
+        new = json.load(f)
+    if base.get("config") != new.get("config"):
+        print("⚠️ The two runs used different benchmark settings")
+
+    regressed = False
+    for metric, higher_is_better in METRICS.items():
+        old, current = base.get(metric), new.get(metric)
+        if not old or current is None:
+            continue
+        change = (current - old) / old
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            flag = "  ❌ regression"
+            regressed = True
+        elif worse < -threshold:
+            flag = "  ✅ improvement"
+        print(f"  {metric:<26}{old:>12} -> {current:<12} ({change:+.1%}){flag}")
+    return regressed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local fake GeoOp.")
+    parser.add_argument("--mode", choices=("browser", "http"), default="browser")
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=20, help="note rows per job")
+    parser.add_argument("--attachment-kb", type=int, default=200)
+    parser.add_argument("--latency-ms", type=int, default=0, help="delay added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of attachment requests answered 503")
+    parser.add_argument("--lazy-batch", type=int, default=0, help="rows rendered up front; the rest load on scroll")
+    parser.add_argument("--full-browser", action="store_true",
+                        help="use a stock Chrome profile instead of the lean one, to measure what it saves")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two saved results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    results, bad_attachments = run(args)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+    if bad_attachments:
+        for problem in bad_attachments[:20]:
+            print(f"❌ {problem}")
+        sys.exit(f"❌ {len(bad_attachments)} downloaded file(s) are not the attachments served")
+
+
+if __name__ == "__main__":
+    main()
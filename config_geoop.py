@@ -9,4 +9,133 @@ JOB_URLS_LIST= [
     "https://www.geoop.com/jobs/50503817"
 ]
 
+# Attachment downloads: parallel fetches per job and the cap on bytes transferring at once
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_MAX_INFLIGHT_BYTES = 64 * 1024 * 1024
+
+# Content-addressed storage: keep one copy per file digest and link it into output/ ("hardlink", "reflink" or "copy")
+CONTENT_STORE = False
+CONTENT_STORE_DIR = "output/.store"
+CONTENT_STORE_LINK = "hardlink"
+
+# Conditional GETs: remember each attachment's ETag/Last-Modified, size and path so reruns ask the server
+# whether it changed (a 304 is only a header exchange) instead of downloading it again
+VALIDATOR_CACHE = True
+VALIDATOR_CACHE_FILE = "validator_cache.db"
+
+# Hosts whose ETag is the MD5 of the body (e.g. S3 for single-part uploads); downloads from them are
+# rejected and retried on a mismatch. Elsewhere a mismatching MD5-like ETag is only logged
+MD5_ETAG_HOSTS = []
+
+# Parallel browsers (overridable with --workers) and the time a job may take before its browser is recycled
+BROWSER_WORKERS = 1
+JOB_TIMEOUT = 600
+
+# Readiness waits: per-stage timeouts in seconds, and how long the note table must go unchanged to count as loaded
+WAIT_TIMEOUTS = {"page_load": 20, "notes_tab": 20, "table_stable": 60}
+TABLE_QUIET_MS = 750
+
+# Run ledger: SQLite file tracking job/attachment progress, and how many updates to group per commit
+LEDGER_FILE = "run_ledger.db"
+LEDGER_BATCH_SIZE = 100
+
+# Job discovery (--discover): file recording the last job list page crawled, so a crawl can resume
+DISCOVERY_CHECKPOINT = "discovery_checkpoint.json"
+
+# Metrics: JSON-lines file with per-job phase timings, WebDriver command counts and download stats
+METRICS_FILE = "metrics.jsonl"
+
+# Rate limiting per host: page/API requests per second and burst size (attachment downloads aren't paced),
+# the concurrency ceiling shared by both (halved automatically on throttling/errors) and the latency counted as "slow"
+RATE_LIMIT_PER_SECOND = 5
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_MAX_CONCURRENCY = 8
+RATE_LIMIT_SLOW_SECONDS = 15
+
+# Session check: one cheap authenticated page fetched to confirm saved cookies still work (None uses JOBS_URL)
+SESSION_CHECK_URL = None
+
+# Browser profile: headless Chrome that skips images, fonts, media and analytics (LEAN_BROWSER), restarted
+# after DRIVER_MAX_JOBS jobs or once it uses more than DRIVER_MAX_RSS_MB (the memory check needs psutil)
+HEADLESS = True
+LEAN_BROWSER = True
+BLOCKED_URL_PATTERNS = [
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.mp4*", "*.webm*", "*.mov*", "*.mp3*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*intercom.io*", "*segment.io*", "*facebook.net*",
+]
+DRIVER_MAX_JOBS = 50
+DRIVER_MAX_RSS_MB = 1500
+
+# chromedriver binary to use; None installs one with webdriver-manager once and reuses its path afterwards
+CHROMEDRIVER_PATH = None
+
+# Browser daemon (--daemon / --attach): local address the warm browsers listen on for job URLs
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+
+# Pipeline: how many read jobs may wait for their downloads while the browser moves on (0 downloads
+# each job before reading the next), and how many jobs download at once
+PIPELINE_DEPTH = 2
+PIPELINE_WORKERS = 2
+
+# Post-processing in a process pool: per-job manifest.json (SHA-256, size, dimensions, EXIF time),
+# thumbnails (0 = none), Before/After photo sorting, and optional "webp"/"avif" copies. Image steps need Pillow.
+POSTPROCESS = False
+POSTPROCESS_WORKERS = None  # None = one per CPU
+POSTPROCESS_THUMBNAIL_SIZE = 320
+POSTPROCESS_REENCODE = None
+POSTPROCESS_SORT_PHOTOS = True
+
+# Attachment index: SQLite table of every saved file (job, client, dates, URL, size, type), queried with
+# python -m utils.attachment_index
+ATTACHMENT_INDEX = True
+ATTACHMENT_INDEX_FILE = "output/index.db"
+
+# Archive output: None writes loose files as before; "zip", "tar" or "tar.zst" (needs zstandard) packs
+# each job into one archive with an embedded manifest.json and removes the loose files. POSTPROCESS is
+# skipped in this mode, since it works on the loose files after the job has been saved.
+ARCHIVE_OUTPUT = None
+
+# Multi-node runs (scraper.py --queue): the shared job queue file, on storage every node can reach, how
+# long a node's lease on a job lasts without renewal, tries per job, and how often an idle node checks for
+# jobs handed back by dead nodes
+WORK_QUEUE_FILE = "work_queue.db"
+QUEUE_LEASE_SECONDS = 900
+QUEUE_MAX_ATTEMPTS = 3
+QUEUE_POLL_SECONDS = 10
+
+# Snapshots: save each job's rendered Job and Notes & Documents pages (gzipped) for offline parser replay
+# with python -m utils.snapshots replay. Also turned on by scraper.py --capture-snapshots.
+SNAPSHOT_CAPTURE = False
+SNAPSHOT_FOLDER = "snapshots"
+
+# XHR extraction: read the job and its notes from the JSON the Angular app fetches (via Chrome's performance
+# log) instead of waiting for and scrolling the rendered page. The URL patterns and JSON paths below are
+# placeholders - copy the real ones from DevTools' Network tab on a job page. Jobs whose responses are
+# missing or incomplete fall back to the page.
+XHR_EXTRACTION = False
+XHR_API = {
+    "urls": {"notes": "*/api/jobs/*/notes*", "job": "*/api/jobs/*"},
+    "job": {"job_id": "id", "client_name": "client.name", "service_name": "title", "visit_text": "visits.0.start"},
+    "notes": "notes",
+    "notes_total": "total",
+    "row": {
+        "date": "created_at",
+        "url": "attachment.url",
+        "description": "attachment.name",
+        "file_size": "attachment.size",
+        "note": "description",
+    },
+}
+# Time zone the GeoOp account shows times in, as an IANA name like "Australia/Sydney"; the API's UTC timestamps
+# are converted to it so notes land in the same date folders as when read from the page. None uses this machine's
+XHR_TIMEZONE = None
+
+# Incremental runs (also scraper.py --incremental): revisit finished jobs and only save notes newer than the
+# high-water mark each job's last complete run left in the ledger. Not available with ARCHIVE_OUTPUT.
+INCREMENTAL = False
+
 # ANYDESK: 430 854 424
\ No newline at end of file
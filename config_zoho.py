@@ -10,3 +10,11 @@ ZOHO_ACCOUNTS_URL = "https://crm.zoho.com/crm/org699382348/tab/Accounts/custom-v
 
 # Other Zoho-specific settings
 ZOHO_SEARCH_TIMEOUT = 10  # Time in seconds to wait for search results
+
+# Parent-company folders: with ZOHO_PARENT_FOLDERS on, jobs are saved under
+# output/<parent account>/<job id>/<client> for clients that have a parent in Zoho.
+# Answers are cached in COMPANY_CACHE_FILE for COMPANY_CACHE_TTL_DAYS, so a client
+# already looked up never opens Zoho again.
+ZOHO_PARENT_FOLDERS = False
+COMPANY_CACHE_FILE = "company_cache.db"
+COMPANY_CACHE_TTL_DAYS = 30
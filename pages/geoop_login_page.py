@@ -33,4 +33,10 @@ class LoginPage:
             )
             self.driver.execute_script("arguments[0].click();", login_btn)  # JavaScript click
 
+    def wait_until_logged_in(self, timeout=30):
+        """Wait for the login form to go away after submitting it"""
+        WebDriverWait(self.driver, timeout).until(
+            EC.invisibility_of_element_located(self.username_field)
+        )
+
 
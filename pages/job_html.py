@@ -0,0 +1,144 @@
+# pages/job_html.py
+# Parses a job page from its HTML with the same selectors the page objects use,
+# so job data can be extracted without a live browser.
+import re
+
+from bs4 import BeautifulSoup
+
+FILE_SIZE_PATTERN = re.compile(r'\s*\((\d+\.?\d*\s*[KMG]B)\)')
+
+
+class MissingNoteTable(ValueError):
+    """The page has no Notes & Documents table, e.g. an error page or a redesign, so its rows can't be read."""
+
+
+def parse_job_id(text):
+    """Return the job number from text like 'Job #12345 ...', without the '#'."""
+    job_id = None
+    for token in (text or "").split(" "):
+        if token.startswith("#"):
+            job_id = token
+    if job_id:
+        return job_id.replace('#', '')
+    return None
+
+
+def parse_visit_date(text):
+    """Return the first visit's day and month joined with '_', or '' if not recognised."""
+    date_elements = []
+    if text:
+        for date in text.split(" "):
+            if "-" in date or ":" in date:
+                continue
+            date_elements.append(date)
+    if len(date_elements) == 2:
+        return "_".join(date_elements)
+    if len(date_elements) == 4:
+        return "_".join(date_elements[:2])
+    return ""
+
+
+def _text(element):
+    return element.get_text(" ", strip=True) if element is not None else None
+
+
+def _has_exact_class(element, cls):
+    return " ".join(element.get("class", [])) == cls
+
+
+def _own_text(element):
+    for child in element.children:
+        if isinstance(child, str):
+            return child
+    return ""
+
+
+def parse_note_rows(soup):
+    """
+    Return the Notes & Documents rows in the same shape as
+    NotesDocumentsPage.extract_rows(). Raises MissingNoteTable if the page has
+    no note table at all, rather than reporting a job with no notes.
+    """
+    table = soup.find("table", id="noteTable")
+    if table is None:
+        raise MissingNoteTable("No Notes & Documents table on the page")
+
+    records = []
+    for row in table.select("tr.message-attachment-list-item"):
+        date = None
+        for cell in row.find_all("td"):
+            if _has_exact_class(cell, "ng-binding") and ":" in _own_text(cell):
+                date = _text(cell)
+                break
+
+        url = None
+        thumb = row.find(lambda tag: tag.name == "td" and _has_exact_class(tag, "attachment-thumb"))
+        if thumb is not None:
+            img = thumb.find("img", recursive=False)
+            if img is not None:
+                url = img.get("data-geo-image-modal-url")
+            if not url:
+                anchor = thumb.find("a")
+                if anchor is not None:
+                    url = anchor.get("data-ng-href")
+
+        note = row.find(lambda tag: tag.name == "td" and _has_exact_class(tag, "note-description ng-binding"))
+
+        description = None
+        file_size = None
+        file_desc = row.find("div", class_="file-description")
+        if file_desc is not None:
+            description = _text(file_desc)
+            size = FILE_SIZE_PATTERN.search(description)
+            if size:
+                file_size = size.group(1)
+            description = FILE_SIZE_PATTERN.sub('', description).strip()
+
+        records.append({
+            "date": date,
+            "url": url or None,
+            "description": description,
+            "file_size": file_size,
+            "note": _text(note),
+        })
+    return records
+
+
+def parse_job_details(soup):
+    """Read client_name, service_name, job_id and visit_text from the Job tab."""
+    client = soup.find("a", id="job_client_link")
+
+    service_name = ""
+    for div in soup.find_all("div", class_="job-edit-details-limit"):
+        text = _text(div)
+        if "Job Title:" in text:
+            service_name = text.replace("Job Title:", "").strip()
+            break
+
+    return {
+        "client_name": _text(client) or "",
+        "service_name": service_name,
+        "job_id": parse_job_id(_text(soup.find("span", attrs={"data-ng-show": "job.id"}))),
+        "visit_text": _text(soup.find("div", attrs={"data-ng-hide": "visits | isEmpty"})) or "",
+    }
+
+
+def parse_job_html(html):
+    """
+    Extract the job details and note rows from a job page's HTML.
+    Returns a dict with client_name, service_name, job_id, visit_text and rows.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    job = parse_job_details(soup)
+    job["rows"] = parse_note_rows(soup)
+    return job
+
+
+def parse_job_pages(job_html, notes_html):
+    """
+    The same as parse_job_html, for a job captured in the browser as two
+    pages: the Job tab (details) and the Notes & Documents tab (rows).
+    """
+    job = parse_job_details(BeautifulSoup(job_html, "html.parser"))
+    job["rows"] = parse_note_rows(BeautifulSoup(notes_html, "html.parser"))
+    return job
@@ -2,6 +2,15 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+# Reads every job link's href in one round trip instead of one call per element
+JOB_HREFS_JS = """
+return Array.prototype.map.call(
+    document.querySelectorAll('a.job-column-link'),
+    function (link) { return link.href; }
+).filter(function (href) { return href; });
+"""
 
 class JobListPage:
     def __init__(self, driver):
@@ -43,3 +52,39 @@ class JobListPage:
         except:
             print("✅ No more pages found.")
             return False
+
+    def get_job_urls(self):
+        """Returns the hrefs of every job link on the current page."""
+        try:
+            return WebDriverWait(self.driver, 15).until(
+                lambda d: d.execute_script(JOB_HREFS_JS)
+            )
+        except TimeoutException:
+            print("⚠️ Timeout: No job links found on this page.")
+            return []
+
+    def iter_job_urls(self, start_page=1):
+        """
+        Pages through the job list and yields (page_number, job_urls) for each
+        page from start_page on. Earlier pages are skipped without reading them.
+        """
+        page = 1
+        while page < start_page:
+            if not self._next_page():
+                return
+            page += 1
+        while True:
+            yield page, self.get_job_urls()
+            if not self._next_page():
+                return
+            page += 1
+
+    def _next_page(self):
+        """Go to the next page and wait for the current job links to be replaced."""
+        first_job = WebDriverWait(self.driver, 15).until(
+            EC.presence_of_element_located(self.job_list)
+        )
+        if not self.go_to_next_page():
+            return False
+        WebDriverWait(self.driver, 15).until(EC.staleness_of(first_job))
+        return True
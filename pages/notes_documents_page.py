@@ -5,41 +5,104 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
+# Walks the note table in the browser and returns one record per row, so the
+# whole table costs a single WebDriver round trip instead of several per row.
+EXTRACT_ROWS_JS = """
+function exactClass(root, tag, cls) {
+    var nodes = root.getElementsByTagName(tag);
+    for (var i = 0; i < nodes.length; i++) {
+        if (nodes[i].getAttribute('class') === cls) { return nodes[i]; }
+    }
+    return null;
+}
+function ownText(node) {
+    for (var i = 0; i < node.childNodes.length; i++) {
+        if (node.childNodes[i].nodeType === Node.TEXT_NODE) { return node.childNodes[i].nodeValue; }
+    }
+    return '';
+}
+var table = document.getElementById('noteTable');
+if (!table) { return []; }
+var rows = table.querySelectorAll('tr.message-attachment-list-item');
+var records = [];
+for (var r = 0; r < rows.length; r++) {
+    var row = rows[r];
+    var date = null;
+    var cells = row.getElementsByTagName('td');
+    for (var c = 0; c < cells.length; c++) {
+        if (cells[c].getAttribute('class') === 'ng-binding' && ownText(cells[c]).indexOf(':') !== -1) {
+            date = cells[c].innerText.trim();
+            break;
+        }
+    }
+
+    var url = null;
+    var thumb = exactClass(row, 'td', 'attachment-thumb');
+    if (thumb) {
+        var img = null;
+        for (var k = 0; k < thumb.children.length; k++) {
+            if (thumb.children[k].tagName === 'IMG') { img = thumb.children[k]; break; }
+        }
+        if (img) { url = img.getAttribute('data-geo-image-modal-url'); }
+        if (!url) {
+            var anchor = thumb.querySelector('a');
+            if (anchor) { url = anchor.getAttribute('data-ng-href'); }
+        }
+    }
+
+    var note = exactClass(row, 'td', 'note-description ng-binding');
+    var description = null;
+    var fileSize = null;
+    var fileDesc = row.querySelector('div[class*="file-description"]');
+    if (fileDesc) {
+        description = fileDesc.innerText;
+        var size = description.match(/\\(\\d+\\.?\\d*\\s*[KMG]B\\)/);
+        if (size) { fileSize = size[0].slice(1, -1); }
+        description = description.replace(/\\s*\\(\\d+\\.?\\d*\\s*[KMG]B\\)/g, '').trim();
+    }
+
+    records.push({
+        date: date,
+        url: url || null,
+        description: description,
+        file_size: fileSize,
+        note: note ? note.innerText : null
+    });
+}
+return records;
+"""
+
+
 class NotesDocumentsPage:
     def __init__(self, driver):
         self.driver = driver
         # Use an XPath to select all note rows on the tab.
         self.note_rows = (By.XPATH, "//tr[contains(@class, 'message-attachment-list-item')]")
     
+    def extract_rows(self):
+        """
+        Returns every note row as a dict with keys:
+          - date: the note's date/time text
+          - url: the image (data-geo-image-modal-url) or PDF (data-ng-href) URL
+          - description: the file description without its size
+          - file_size: e.g. "1.2 MB"
+          - note: the note text
+        Missing values are None.
+        """
+        return self.driver.execute_script(EXTRACT_ROWS_JS)
+
     def get_service_notes(self):
         """
-        Loops through each note row and extracts:
-          - The service date (assumed to be in the 2nd <td>)
-          - The note description (assumed to be in the 4th <td>)
-          - The image URL if present (attempted from the 3rd <td>)
+        Loops through each note row and extracts the date, the note (or file
+        description) and the attachment URL.
         Returns a concatenated string of these details.
         """
-        note_elements = WebDriverWait(self.driver, 10).until(
-            EC.presence_of_all_elements_located(self.note_rows)
-        )
+        rows = WebDriverWait(self.driver, 10).until(lambda d: self.extract_rows())
         all_notes = []
-        for row in note_elements:
-            try:
-                # Extract the service date (2nd <td>)
-                service_date = row.find_element(By.XPATH, "./td[2]").text.strip()
-            except:
-                service_date = "UnknownDate"
-            try:
-                # Extract the note description (4th <td>)
-                note_description = row.find_element(By.XPATH, "./td[4]").text.strip()
-            except:
-                note_description = "No description"
-            try:
-                # Try to locate an image inside the 3rd <td>
-                img_elem = row.find_element(By.XPATH, "./td[3]//img")
-                img_url = img_elem.get_attribute("src")
-            except:
-                img_url = ""
+        for row in rows:
+            service_date = (row["date"] or "UnknownDate").strip()
+            note_description = (row["note"] or row["description"] or "No description").strip()
+            img_url = row["url"] or ""
             note_entry = f"Date: {service_date}\nNote: {note_description}\nImage URL: {img_url}"
             all_notes.append(note_entry)
         return "\n\n".join(all_notes)
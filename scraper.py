@@ -1,12 +1,12 @@
-import time
 import os
-import json
+import argparse
+from urllib.parse import urlsplit
+from zoneinfo import ZoneInfo
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-import requests
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 import re
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
@@ -17,31 +17,43 @@ from pages.geoop_login_page import LoginPage
 from pages.job_list_page import JobListPage
 from pages.job_page import JobPage
 from pages.notes_documents_page import NotesDocumentsPage
+from pages.job_html import MissingNoteTable, parse_job_id, parse_visit_date
 from utils.image_wait import wait_for_angular
+from utils.readiness import ReadinessWaiter
+from utils.downloader import Downloader
+from utils.content_store import ContentStore
+from utils.validator_cache import ValidatorCache
+from utils.browser_pool import BrowserPool
+from utils.http_session import SessionExpired, fetch_job
+from utils.run_ledger import RunLedger
+from utils.discovery import discover_job_urls
+from utils.metrics import JobMetrics, MetricsRecorder, instrument_driver
+from utils.rate_limiter import RateLimiter
+from utils.session_manager import SessionManager
+from utils.chrome_profile import RecyclePolicy, block_urls, browser_options
+from utils.browser_daemon import BrowserDaemon, send_command, submit
+from utils.pipeline import DownloadPipeline
+from utils.postprocess import PostProcessor
+from utils.attachment_index import AttachmentIndex
+from utils.archive_writer import ArchiveWriter
+from utils.company_resolver import CompanyResolver
+from utils.work_queue import QueuedLedger, WorkQueue
+from utils.snapshots import save_snapshot
+from utils.xhr_capture import XhrCapture, job_from_responses
+from utils.high_water import advance, new_rows, reached
 
 
 # Config file with USERNAME, PASSWORD, LOGIN_URL, JOBS_URL
 import config_geoop
+import config_zoho
 from config_geoop import JOB_URLS_LIST as urls
 
 COOKIES_FILE = "cookies.json"
+DRIVER_PATH_CACHE = ".chromedriver_path"
 
-def load_cookies_json(driver, filename=COOKIES_FILE):
-    """Load cookies from JSON file to skip 2FA."""
-    if os.path.exists(filename):
-        print("🔄 Attempting to load cookies to skip 2FA...")
-        with open(filename, "r") as f:
-            cookies = json.load(f)
-        for cookie in cookies:
-            driver.add_cookie(cookie)
-        print("✅ Cookies loaded successfully!")
-
-def save_cookies_json(driver, filename=COOKIES_FILE):
-    """Save cookies to JSON after passing login + 2FA."""
-    cookies = driver.get_cookies()
-    with open(filename, "w") as f:
-        json.dump(cookies, f, indent=2)
-    print("✅ Cookies saved to JSON!")
+def create_sessions():
+    """Build the session manager that shares the saved GeoOp login with every worker."""
+    return SessionManager(COOKIES_FILE, check_url=config_geoop.SESSION_CHECK_URL or config_geoop.JOBS_URL)
 
 def sanitize_path_component(component):
     """Sanitize a path component by removing or replacing invalid characters."""
@@ -53,297 +65,871 @@ def sanitize_path_component(component):
     component = re.sub(r'\s+', '_', component)
     return component
 
-def process_job_page(driver, job_url):
-    """Process a single job URL: extract details, download notes and images."""
+def create_limiter():
+    """Build the rate limiter shared by page loads and downloads."""
+    return RateLimiter(
+        rate=config_geoop.RATE_LIMIT_PER_SECOND,
+        burst=config_geoop.RATE_LIMIT_BURST,
+        max_concurrency=config_geoop.RATE_LIMIT_MAX_CONCURRENCY,
+        slow_seconds=config_geoop.RATE_LIMIT_SLOW_SECONDS,
+    )
+
+def create_downloader():
+    """Build the shared attachment downloader (and its rate limiter) from the config settings."""
+    store = None
+    if config_geoop.CONTENT_STORE:
+        store = ContentStore(config_geoop.CONTENT_STORE_DIR, link_mode=config_geoop.CONTENT_STORE_LINK)
+    return Downloader(
+        max_workers=config_geoop.DOWNLOAD_WORKERS,
+        max_inflight_bytes=config_geoop.DOWNLOAD_MAX_INFLIGHT_BYTES,
+        store=store,
+        limiter=create_limiter(),
+        validators=ValidatorCache(config_geoop.VALIDATOR_CACHE_FILE) if config_geoop.VALIDATOR_CACHE else None,
+        md5_etag_hosts=config_geoop.MD5_ETAG_HOSTS,
+    )
+
+def load_page(driver, job_url, waiter, swallow=True):
     driver.get(job_url)
-    time.sleep(3)
+    waiter.page_ready(swallow)
+
+def extract_job(driver, job_url, waiter, metrics, limiter, capture=False, xhr_api=None, mark=None):
+    """
+    Load a job in the browser and read its details and Notes & Documents rows.
+    Returns a dict with url, client_name, service_name, job_id, visit_text and rows.
+    With capture, the rendered HTML of both tabs is added under "snapshot".
+    With xhr_api, the job is built from the app's JSON responses when they
+    are complete, skipping the page reading (and the snapshot) below.
+    With a high-water mark, scrolling stops once the rows loaded reach it.
+    """
+    xhr = XhrCapture(driver, xhr_api["urls"]) if xhr_api else None
+    if xhr is not None:
+        xhr.clear()
+
+    with metrics.phase("page_load"):
+        # A page that never becomes ready counts as an error for the limiter and is retried after a
+        # backoff, like a failed download; if it still isn't ready, the job carries on as before
+        try:
+            limiter.call(
+                job_url,
+                lambda: load_page(driver, job_url, waiter, swallow=False),
+                retryable=lambda e: isinstance(e, TimeoutException),
+            )
+        except TimeoutException:
+            print(f"⚠️ {job_url} still not ready after retries; continuing")
+
+    if xhr is not None:
+        with metrics.phase("xhr"):
+            job = extract_job_xhr(driver, xhr, xhr_api, waiter)
+        if job is not None:
+            job["url"] = job_url
+            return job
+        print("⚠️ Job/notes API responses incomplete; reading the page instead")
+        with metrics.phase("page_load"):
+            load_page(driver, job_url, waiter)
 
     # Extract data from the Job tab
     job_page = JobPage(driver)
-    try:
-        client_name = job_page.get_client_name()
-        # if client_name:
-        #     if "-" in client_name:
-        #         client_name = client_name.split("-")[-1]
-    except Exception:
-        client_name = ""
-    try:
-        service_name = job_page.get_service_name()
-    except Exception:
-        service_name = ""
-        
-    try:
-        job_id = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, "//span[@data-ng-show='job.id']"))
-        )
-        text_job_id = job_id.text
-        job_text_li = text_job_id.split(" ")
-        for job_id_val in job_text_li:
-            if job_id_val.startswith("#"):
-                job_id_lval = job_id_val
-        
-        if job_id_lval:
-            job_id_lval = job_id_lval.replace('#', '')
-        else:
+    with metrics.phase("client_name"):
+        try:
+            client_name = job_page.get_client_name()
+            # if client_name:
+            #     if "-" in client_name:
+            #         client_name = client_name.split("-")[-1]
+        except Exception:
+            client_name = ""
+    with metrics.phase("service_name"):
+        try:
+            service_name = job_page.get_service_name()
+        except Exception:
+            service_name = ""
+
+    with metrics.phase("job_id"):
+        try:
+            job_id = WebDriverWait(driver, 15).until(
+                EC.visibility_of_element_located((By.XPATH, "//span[@data-ng-show='job.id']"))
+            )
+            job_id_lval = parse_job_id(job_id.text)
+        except:
             job_id_lval = None
-    except:
-        job_id_lval = None
-        
+
+    with metrics.phase("visit_date"):
+        try:
+            date_visit = WebDriverWait(driver, 15).until(
+                EC.visibility_of_element_located((By.XPATH, "//div[@data-ng-hide='visits | isEmpty']"))
+            )
+            visit_text = date_visit.text
+        except TimeoutException:
+            visit_text = ""
+            print("No images found in this job's Notes & Documents tab; skipping image download.")
+
+    snapshot = {}
+    if capture:
+        snapshot["job"] = driver.page_source
+
+    # Switch to the "Notes & Documents" tab
+    with metrics.phase("notes_tab"):
+        job_page.go_to_notes_documents()
+        waiter.notes_ready()
+
+    notes_page = NotesDocumentsPage(driver)
+
+    # Scroll until the table stops growing so every lazy-loaded row is present
+    with metrics.phase("scroll"):
+        waiter.table_stable(done=(lambda: reached(notes_page.extract_rows(), mark)) if mark else None)
+
+    # Wait for the rows to be present, then read the whole table in one round trip
+    with metrics.phase("table_extraction"):
+        rows = WebDriverWait(driver, 30).until(lambda d: notes_page.extract_rows())
+    if capture:
+        snapshot["notes"] = driver.page_source
+
+    job = {
+        "url": job_url,
+        "client_name": client_name,
+        "service_name": service_name,
+        "job_id": job_id_lval,
+        "visit_text": visit_text,
+        "rows": rows,
+    }
+    if capture:
+        job["snapshot"] = snapshot
+    return job
+
+def process_job_page(driver, job_url, downloader=None, ledger=None, metrics=None, consumers=(), resolver=None):
+    """Process a single job URL: extract details, download notes and images."""
+    if downloader is None:
+        downloader = create_downloader()
+    if metrics is None:
+        metrics = JobMetrics(job_url, driver)
+    job = extract_job_page(driver, job_url, downloader.limiter, metrics, incremental_mark(ledger, job_url))
+    result = save_job(job, downloader, ledger, metrics, consumers, resolver)
+    result["wait_timings"] = job["wait_timings"]
+    return result
+
+def extract_job_xhr(driver, xhr, xhr_api, waiter):
+    """Build the job from the captured API responses, opening the notes tab if they haven't been fetched yet."""
+    responses = xhr.responses()
+    if "notes" not in responses:
+        JobPage(driver).go_to_notes_documents()
+        waiter.notes_ready()
+        responses.update(xhr.responses())
+    tz = ZoneInfo(config_geoop.XHR_TIMEZONE) if config_geoop.XHR_TIMEZONE else None
+    return job_from_responses(responses, xhr_api, tz)
+
+def incremental_mark(ledger, job_url):
+    """The job's high-water mark in an --incremental run, else None."""
+    if not config_geoop.INCREMENTAL or ledger is None:
+        return None
+    return ledger.high_water_mark(job_url)
+
+def extract_job_page(driver, job_url, limiter, metrics, mark=None):
+    """
+    Browser stage of a job: extract_job plus the readiness wait timings, under
+    "wait_timings". With SNAPSHOT_CAPTURE on, the rendered pages are saved to
+    SNAPSHOT_FOLDER for offline replay.
+    """
+    waiter = ReadinessWaiter(
+        driver,
+        timeouts=config_geoop.WAIT_TIMEOUTS,
+        table_quiet_ms=config_geoop.TABLE_QUIET_MS,
+    )
+    job = extract_job(
+        driver, job_url, waiter, metrics, limiter,
+        capture=config_geoop.SNAPSHOT_CAPTURE,
+        xhr_api=config_geoop.XHR_API if config_geoop.XHR_EXTRACTION else None,
+        mark=mark,
+    )
+    if "snapshot" in job:
+        save_snapshot(config_geoop.SNAPSHOT_FOLDER, job_url, job.pop("snapshot"), job)
+    job["wait_timings"] = waiter.timings
+    return job
+
+def save_job(job, downloader, ledger=None, metrics=None, consumers=(), resolver=None):
+    """
+    Write a job's text notes and download its attachments into the output tree.
+    With a ledger, attachments saved by an earlier run are skipped. Each of
+    consumers (post-processing, the attachment index, ...) is then handed the
+    job's details and saved files through consumer.job_saved(saved). With a
+    resolver, jobs of clients that have a Zoho parent account are saved under
+    output/<parent>/<job id>/<client>.
+
+    Once every file is saved, the newest note is recorded as the job's
+    high-water mark; an --incremental run only handles the rows above it.
+    """
+    job_url = job["url"]
+    client_name = job["client_name"]
+    service_name = job["service_name"]
+    job_id_lval = job["job_id"]
+    rows = job["rows"]
+    mark = incremental_mark(ledger, job_url)
+    if mark is not None:
+        rows = new_rows(rows, mark)
+        print(f"🆕 {len(rows)} new row(s) since {mark['note_date']}")
 
     print(f"Scraping job: client={client_name}, service={service_name}")
 
     # Sanitize folder names
     safe_client = sanitize_path_component(client_name)
     safe_service = sanitize_path_component(service_name)
+    safe_date = sanitize_path_component(parse_visit_date(job["visit_text"]))
 
-    try:
-        date_visit = WebDriverWait(driver, 15).until(
-            EC.visibility_of_element_located((By.XPATH, "//div[@data-ng-hide='visits | isEmpty']"))
-        )
-        date_text = date_visit.text
-        
-        date_elements = []
-        if date_text:
-            date_text = date_text.split(" ")
-            for date in date_text:
-                    if "-" in date or ":" in date:
-                        continue
-                    else:
-                        date_elements.append(date)
-        if len(date_elements) == 2:
-            safe_date = "_".join(date_elements)
-        elif len(date_elements) == 4:
-            safe_date = "_".join(date_elements[:2])
-        else:
-            safe_date = ""
-    except TimeoutException:
-        safe_date = ""
-        print("No images found in this job's Notes & Documents tab; skipping image download.")
-
-    safe_date = sanitize_path_component(safe_date)
-    
-    # Switch to the "Notes & Documents" tab
-    job_page.go_to_notes_documents()
-    time.sleep(5)
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-
+    parent_company = resolver.parent_company(client_name) if resolver is not None else None
     parent_path = [job_id_lval, safe_client]
+    if parent_company:
+        parent_path.insert(0, sanitize_path_component(parent_company))
     
     folder_path = os.path.join("output", *parent_path)
     os.makedirs(folder_path, exist_ok=True)
 
+    done_paths = ledger.done_attachments(job_url) if ledger is not None else set()
+
+    # Keep track of downloaded images to avoid duplicates; file_index numbers the saved files
+    seen_urls = set()
+    first_index = file_index = mark["next_index"] if mark else 0
+    downloads = []
+    saved_files = []
+    file_info = {}
     
-    try:
-        WebDriverWait(driver, 15).until(
-            EC.visibility_of_all_elements_located((By.CSS_SELECTOR, "td.attachment-thumb img"))
+    for row in rows:
+        try:
+            date_text = row["date"]
+            if date_text is None:
+                print("No date found for row; skipping")
+                continue
+            if date_text:
+                date_text = date_text.split(" ")[:3]
+                date_text = "_".join(date_text)
+            print(f"Date: {date_text}")     
+            safe_date_text = sanitize_path_component(date_text)
+
+            image_url = row["url"]
+
+            # If no image or pdf consider it as a text file
+            text = None if image_url else row["note"]
+            
+            # Skip if no valid URL found or if we've already downloaded this image
+            if not image_url and not text or image_url in seen_urls:
+                continue
+                
+            print(f"Image/PDF URL: {image_url}")  
+            
+            if image_url:
+                print("Image URL found")
+                folder_path_for_images = os.path.join("output", *parent_path, date_text)
+                os.makedirs(folder_path_for_images, exist_ok=True)          
+
+                # Get file description if available
+                file_desc = row["description"]
+                if file_desc is not None:
+                    print(f"File description: {file_desc}")
+
+                    # Use the cleaned file description as the filename
+                    image_filename = f"{file_index}{file_desc}"
+                    print(f"Image filename: {image_filename}")
+
+                    image_path = os.path.join(folder_path_for_images, image_filename)
+                else:
+                    print("No file description found; using default filename")
+                    # Named by position, not time, so a rerun finds it in the ledger instead of saving a copy
+                    extension = os.path.splitext(urlsplit(image_url).path)[1] or ".jpg"
+                    image_filename = f"file_{file_index}{sanitize_path_component(extension)}"
+                    image_path = os.path.join(folder_path_for_images, image_filename)
+
+                print(f"Downloading image to: {image_path}")
+
+                # Queue the download; the whole job is fetched in one batch below
+                file_info[image_path] = {
+                    "path": image_path, "url": image_url, "description": file_desc, "note_date": row["date"]
+                }
+                if image_path in done_paths and os.path.exists(image_path):
+                    print("Already downloaded in an earlier run; skipping")
+                    saved_files.append(file_info[image_path])
+                else:
+                    downloads.append((image_url, image_path))
+                seen_urls.add(image_url)
+                file_index += 1
+            elif text:
+                print("Text found")
+                folder_path_for_text = os.path.join("output", *parent_path, date_text)
+                os.makedirs(folder_path_for_text, exist_ok=True)
+                text_path = os.path.join(folder_path_for_text, f"{safe_date_text}{file_index}.txt")
+                with open(text_path, "w") as f:
+                    f.write(text)
+                saved_files.append({"path": text_path, "url": None, "description": None, "note_date": row["date"]})
+                file_index += 1
+        except Exception as e:
+            print(f"Error processing single image in job: {e}")
+
+    record_download = None
+    if ledger is not None:
+        for image_url, image_path in downloads:
+            ledger.start_attachment(job_url, image_url, image_path)
+
+        def record_download(image_url, image_path, error):
+            if error is None:
+                ledger.finish_attachment(job_url, image_path)
+            else:
+                ledger.fail_attachment(job_url, image_path, error)
+
+    if metrics is None:
+        metrics = JobMetrics(job_url)
+    with metrics.phase("downloads"):
+        results = downloader.download_all(
+            downloads, max_workers=config_geoop.DOWNLOAD_WORKERS, on_result=record_download, metrics=metrics
         )
-    except TimeoutException:
-        print("No images found in this job's Notes & Documents tab; skipping image download.")
-        
-        
-    parent_xpath = "//table[@id='noteTable']//tr[@class='message-attachment-list-item ng-scope']"
-
-    # Add explicit waits and scrolling
-    # notes_documents_page = NotesDocumentsPage(driver)
-    
-    # Scroll multiple times to ensure all images are loaded
-    last_height = driver.execute_script("return document.body.scrollHeight")
-    while True:
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)  # Give time for images to load
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
-
-    # Wait for all image elements to be present
+    downloaded_count = file_index - first_index - results.count(False)
+    if ledger is not None and not results.count(False):
+        new_mark = advance(mark, rows, file_index)
+        if new_mark is not None:
+            ledger.set_high_water_mark(job_url, new_mark)
+
+    saved_files += [file_info[image_path] for (image_url, image_path), ok in zip(downloads, results) if ok]
+    saved = {
+        "job_url": job_url,
+        "job_id": job_id_lval,
+        "client_name": client_name,
+        "parent_company": parent_company,
+        "service_name": service_name,
+        "visit_date": safe_date,
+        "folder_path": folder_path,
+        "files": saved_files,
+    }
+    for consumer in consumers:
+        consumer.job_saved(saved)
+
+    print(f"Successfully downloaded {downloaded_count} files out of {len(rows)} rows")
+
+    return {
+        "downloaded": downloaded_count,
+        "total": len(rows),
+        "client_name": client_name,
+        "parent_company": parent_company,
+        "service_name": service_name,
+        "job_id": job_id_lval,
+        "date": safe_date,
+        "folder_path": folder_path,
+    }
+
+
+def chromedriver_path(refresh=False):
+    """
+    Path to chromedriver: CHROMEDRIVER_PATH if set, else the one installed on an
+    earlier run, so starting a browser doesn't need webdriver-manager's network check.
+    """
+    if config_geoop.CHROMEDRIVER_PATH and not refresh:
+        return config_geoop.CHROMEDRIVER_PATH
+    if not refresh and os.path.exists(DRIVER_PATH_CACHE):
+        with open(DRIVER_PATH_CACHE, "r") as f:
+            path = f.read().strip()
+        if os.path.exists(path):
+            return path
+    path = ChromeDriverManager().install()
+    with open(DRIVER_PATH_CACHE, "w") as f:
+        f.write(path)
+    return path
+
+
+def create_driver():
+    """Start a new Chrome (headless and lean per the config) that counts its WebDriver commands."""
+    options = browser_options(
+        headless=config_geoop.HEADLESS,
+        lean=config_geoop.LEAN_BROWSER,
+        performance_log=config_geoop.XHR_EXTRACTION,
+    )
     try:
-        parent_elements = WebDriverWait(driver, 30).until(  # Increased timeout to 30 seconds
-            EC.presence_of_all_elements_located((By.XPATH, parent_xpath))
-        )
-        
-        # Keep track of downloaded images to avoid duplicates
-        downloaded_images = []
-        
-        for parent_element in parent_elements:
-            try:
-                date_element = parent_element.find_element(By.XPATH, ".//td[@class='ng-binding' and contains(text(), ':')]")
-                date_text = date_element.text
-                if date_text:
-                    date_text = date_text.split(" ")[:3]
-                    date_text = "_".join(date_text)
-                print(f"Date: {date_text}")     
-                safe_date_text = sanitize_path_component(date_text)
-
-                text = None
-                
-                try:
-                    image_element = parent_element.find_element(By.XPATH, ".//td[@class='attachment-thumb']/img")
-                    image_url = image_element.get_attribute("data-geo-image-modal-url")
-                except:
-                    image_url = None
-                
-                # If no image URL found, try looking for an anchor tag with data-ng-href
-                if not image_url:
-                    try:
-                        anchor_element = parent_element.find_element(By.XPATH, ".//td[@class='attachment-thumb']//a")
-                        image_url = anchor_element.get_attribute("data-ng-href")
-                    except:
-                        image_url = None
-
-                # If no image or pdf consider it as a text file
-                if not image_url:
-                    try:
-                        anchor_element = parent_element.find_element(By.XPATH, ".//td[@class='note-description ng-binding']")
-                        text = anchor_element.text
-                    except:
-                        text = None
+        driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+    except SessionNotCreatedException:
+        # Chrome has updated past the cached chromedriver; fetch a matching one
+        print("🔄 Cached chromedriver doesn't match Chrome; installing a new one...")
+        driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=options)
+    if config_geoop.LEAN_BROWSER:
+        # Attachment URLs come from the row attributes, so thumbnails, fonts and trackers are never needed
+        block_urls(driver, config_geoop.BLOCKED_URL_PATTERNS)
+    return instrument_driver(driver)
 
-                
-                # Skip if no valid URL found or if we've already downloaded this image
-                if not image_url and not text or image_url in downloaded_images:
-                    continue
-                    
-                print(f"Image/PDF URL: {image_url}")  
-                
-                if image_url:
-                    print("Image URL found")
-                    folder_path_for_images = os.path.join("output", *parent_path, date_text)
-                    os.makedirs(folder_path_for_images, exist_ok=True)          
-
-                    # Get file description if available
-                    try:
-                        # Get the div with class 'file-description' but exclude the span with file size
-                        file_desc = parent_element.find_element(By.XPATH, ".//div[contains(@class, 'file-description')]").text
-                        # Remove the file size span content using regex
-                        file_desc = re.sub(r'\s*\(\d+\.?\d*\s*[KMG]B\)', '', file_desc).strip()
-                        print(f"File description: {file_desc}")
-
-                        # Clean up the URL to get just the file extension
-                        if '?' in image_url:
-                            base_url = image_url.split('?')[0]
-                            base_url = base_url.split('&')[0]
-                        else:
-                            base_url = image_url
-                            
-                        # Use the cleaned file description as the filename
-                        image_filename = f"{len(downloaded_images)}{file_desc}"
-                        print(f"Image filename: {image_filename}")
-
-                        image_path = os.path.join(folder_path_for_images, image_filename)
-                    except:
-                        print("No file description found; using default filename")
-                        image_filename = f"file_{int(time.time())}_{len(downloaded_images)}.jpg"   
-                        image_path = os.path.join(folder_path_for_images, image_filename)
-
-                    print(f"Downloading image to: {image_path}")
-
-                    # # Generate unique filename using timestamp and a counter
-                    # image_filename = f"image_{int(time.time())}_{len(downloaded_images)}.jpg"
-                    # image_path = os.path.join(folder_path_for_images, image_filename)
-                    
-                    # Download with retry mechanism
-                    max_retries = 3
-                    for attempt in range(max_retries):
-                        try:
-                            response = requests.get(image_url, timeout=30)
-                            response.raise_for_status()
-                            with open(image_path, "wb") as f:
-                                f.write(response.content)
-                            downloaded_images.append(image_url)
-                            break
-                        except (requests.RequestException, IOError) as e:
-                            if attempt == max_retries - 1:
-                                print(f"Failed to download image after {max_retries} attempts: {e}")
-                                continue
-                            time.sleep(2)  # Wait before retrying
-                elif text:
-                    print("Text found")
-                    folder_path_for_text = os.path.join("output", *parent_path, date_text)
-                    os.makedirs(folder_path_for_text, exist_ok=True)
-                    text_path = os.path.join(folder_path_for_text, f"{safe_date_text}{len(downloaded_images)}.txt")
-                    with open(text_path, "w") as f:
-                        f.write(text)
-                    downloaded_images.append(text)
-            except Exception as e:
-                print(f"Error processing single image in job: {e}")
-                
-        print(f"Successfully downloaded {len(downloaded_images)} files out of {len(parent_elements)} rows")
-
-        return {
-            "downloaded": len(downloaded_images),
-            "total": len(parent_elements),
-            "client_name": client_name,
-            "service_name": service_name,
-            "job_id": job_id_lval,
-            "date": safe_date,
-            "folder_path": folder_path,
-        }
-    except Exception as e:
-        print(f"Error processing job: {e}")
-        with open('failed_urls.csv', 'a') as f:
-            f.write(f"{job_url}\n")
 
+def create_recycle_policy():
+    return RecyclePolicy(max_jobs=config_geoop.DRIVER_MAX_JOBS, max_rss_mb=config_geoop.DRIVER_MAX_RSS_MB)
 
-def main():
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
 
-    # ---------------------
-    # 1) Login to GeoOp
-    # ---------------------
+def login(driver, sessions):
+    """Log in to GeoOp, skipping the login form entirely while the saved session is still valid."""
+    if sessions.is_valid():
+        sessions.apply_to_driver(driver, config_geoop.LOGIN_URL)
+        return
+
     print("🔎 Navigating to GeoOp login page...")
+    # The saved cookies still carry the 2FA "remember this device" token
+    sessions.apply_to_driver(driver, config_geoop.LOGIN_URL)
     driver.get(config_geoop.LOGIN_URL)
-    time.sleep(3)
-
-    load_cookies_json(driver)
-    driver.refresh()
-    time.sleep(3)
 
     try:
         login_page = LoginPage(driver)
         login_page.enter_username(config_geoop.USERNAME)
         login_page.enter_password(config_geoop.PASSWORD)
         login_page.click_login()
-        time.sleep(3)
+        login_page.wait_until_logged_in()
     except Exception as e:
-        print("Login with password failed")
+        print(f"Login with password failed: {e}")
+        return
 
+    # Save cookies for future runs and for the other workers
+    sessions.save_from_driver(driver)
 
-    # 3) Save cookies for future runs
-    save_cookies_json(driver)
 
-    # ---------------------
-    driver.get(config_geoop.JOBS_URL)
-    time.sleep(3)
+def create_worker_driver(sessions):
+    """Start a browser that reuses the session saved by login() instead of logging in again."""
+    driver = create_driver()
+    sessions.apply_to_driver(driver, config_geoop.LOGIN_URL)
+    return driver
 
-    for url in urls:
-        try:
-            result = process_job_page(driver, url)
-            print(result)
 
-            if (result["downloaded"] == result["total"]):
-                print("✅ All files downloaded successfully!")
-            else:
-                print("❌ Some files failed to download!")
-                raise Exception("Some files failed to download!")
+def scrape_job(driver, url, downloader, ledger, recorder, consumers=(), resolver=None):
+    """Process one job in the browser, tracking it in the ledger, and raise if any file failed."""
+    ledger.start_job(url)
+    metrics = recorder.job(url, driver)
+    try:
+        with recorder.profiled(url):
+            result = report_result(process_job_page(driver, url, downloader, ledger, metrics, consumers, resolver))
+    except Exception as e:
+        recorder.finish(metrics, error=e)
+        raise
+    recorder.finish(metrics)
+    ledger.finish_job(url)
+    return result
 
-            
-            time.sleep(3)
+
+def scrape_job_http(session, url, downloader, ledger, recorder, consumers=(), resolver=None):
+    """Process one job over plain HTTP; raises SessionExpired if GeoOp wants a new login."""
+    ledger.start_job(url)
+    metrics = recorder.job(url)
+    try:
+        with recorder.profiled(url):
+            with metrics.phase("page_load"):
+                job = fetch_job(session, url, limiter=downloader.limiter)
+            result = report_result(save_job(job, downloader, ledger, metrics, consumers, resolver))
+    except Exception as e:
+        recorder.finish(metrics, error=e)
+        raise
+    recorder.finish(metrics)
+    ledger.finish_job(url)
+    return result
+
+
+def extract_stage(driver, url, downloader, ledger, recorder):
+    """
+    Read one job in the browser for the download pipeline. Returns (job, metrics)
+    for download_stage; the job only counts as done once that has finished too.
+    """
+    ledger.start_job(url)
+    metrics = recorder.job(url, driver)
+    try:
+        with recorder.profiled(url):
+            job = extract_job_page(driver, url, downloader.limiter, metrics, incremental_mark(ledger, url))
+    except Exception as e:
+        recorder.finish(metrics, error=e)
+        raise
+    metrics.browser_done()
+    return job, metrics
+
+
+def download_stage(item, downloader, ledger, recorder, consumers=(), resolver=None):
+    """Save one extracted job's notes and attachments, then record it as done or failed."""
+    job, metrics = item
+    try:
+        result = report_result(save_job(job, downloader, ledger, metrics, consumers, resolver))
+    except Exception as e:
+        recorder.finish(metrics, error=e)
+        fail_job(ledger, job["url"], e)
+        raise
+    recorder.finish(metrics)
+    ledger.finish_job(job["url"])
+    return result
+
+
+def create_postprocessor():
+    """Start the post-processing process pool, or return None if POSTPROCESS is off."""
+    if not config_geoop.POSTPROCESS:
+        return None
+    return PostProcessor(
+        workers=config_geoop.POSTPROCESS_WORKERS,
+        thumbnail_size=config_geoop.POSTPROCESS_THUMBNAIL_SIZE,
+        reencode=config_geoop.POSTPROCESS_REENCODE,
+        sort_photos=config_geoop.POSTPROCESS_SORT_PHOTOS,
+    )
+
+
+def create_consumers():
+    """Everything enabled in the config that wants to hear about each saved job."""
+    consumers = []
+    index = None
+    if config_geoop.ATTACHMENT_INDEX:
+        index = AttachmentIndex(config_geoop.ATTACHMENT_INDEX_FILE)
+        consumers.append(index)
+    if config_geoop.ARCHIVE_OUTPUT:
+        if config_geoop.POSTPROCESS:
+            print("⚠️ POSTPROCESS is skipped with ARCHIVE_OUTPUT; the loose files are gone once archived")
+        # Last, so the consumers before it still see the loose files
+        consumers.append(ArchiveWriter(config_geoop.ARCHIVE_OUTPUT, index=index))
+        return consumers
+    postprocessor = create_postprocessor()
+    if postprocessor is not None:
+        consumers.append(postprocessor)
+    return consumers
+
+
+def create_resolver():
+    """The cached Zoho parent-company lookup, or None if ZOHO_PARENT_FOLDERS is off."""
+    if not config_zoho.ZOHO_PARENT_FOLDERS:
+        return None
+    return CompanyResolver(
+        config_zoho.COMPANY_CACHE_FILE,
+        ttl=config_zoho.COMPANY_CACHE_TTL_DAYS * 24 * 3600,
+        create_driver=create_driver,
+    )
+
+
+def prefetch_companies(resolver, consumers, job_urls):
+    """
+    Resolve, in one Zoho session, the clients of this batch that earlier runs
+    recorded in the attachment index, so the download threads hit the cache.
+    """
+    for consumer in consumers:
+        if isinstance(consumer, AttachmentIndex):
+            resolver.prefetch(consumer.clients(job_urls))
+
+
+def create_work_queue(path):
+    """Join the shared job queue as a worker, renewing this node's leases in the background."""
+    work_queue = WorkQueue(
+        path,
+        lease_seconds=config_geoop.QUEUE_LEASE_SECONDS,
+        max_attempts=config_geoop.QUEUE_MAX_ATTEMPTS,
+    )
+    work_queue.start_heartbeat()
+    print(f"📬 Taking jobs from {path} as {work_queue.worker_id}")
+    return work_queue
+
+
+def create_pipeline(downloader, ledger, recorder, consumers=(), resolver=None):
+    """Start the download stage for a browser run, or return None if PIPELINE_DEPTH turns it off."""
+    if config_geoop.PIPELINE_DEPTH <= 0:
+        return None
+    return DownloadPipeline(
+        lambda item: download_stage(item, downloader, ledger, recorder, consumers, resolver),
+        depth=config_geoop.PIPELINE_DEPTH,
+        workers=config_geoop.PIPELINE_WORKERS,
+    )
+
+
+def report_result(result):
+    """Print a job's result and raise if any of its files failed to download."""
+    print(result)
+
+    if (result["downloaded"] == result["total"]):
+        print("✅ All files downloaded successfully!")
+    else:
+        print("❌ Some files failed to download!")
+        raise Exception("Some files failed to download!")
+    return result
+
+
+def fail_job(ledger, url, error):
+    print(f"Error processing job: {error}")
+    ledger.fail_job(url, error)
+
+
+def run_serial(driver, job_urls, downloader, ledger, recorder, sessions, consumers=(), resolver=None):
+    """
+    Walk the job URLs one after another in a single browser, downloading each
+    job's files while the browser reads the next one. Returns the browser in use at the end.
+    """
+    recycle = create_recycle_policy()
+    pipeline = create_pipeline(downloader, ledger, recorder, consumers, resolver)
+    try:
+        for url in job_urls:
+            try:
+                if pipeline is not None:
+                    pipeline.put(extract_stage(driver, url, downloader, ledger, recorder))
+                else:
+                    scrape_job(driver, url, downloader, ledger, recorder, consumers, resolver)
+            except Exception as e:
+                fail_job(ledger, url, e)
+            if recycle.due(driver):
+                driver.quit()
+                driver = create_worker_driver(sessions)
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+    return driver
+
+
+def run_http(job_urls, downloader, ledger, recorder, sessions, consumers=(), resolver=None):
+    """
+    Walk the job URLs over plain HTTP with the saved session cookies. If GeoOp
+    rejects the session, log in with a browser and finish the run in it. A job
+    page served without its note table is read in the browser instead.
+    """
+    session = sessions.http_session()
+    driver = None
+    use_http = True
+
+    for url in job_urls:
+        try:
+            if use_http:
+                try:
+                    scrape_job_http(session, url, downloader, ledger, recorder, consumers, resolver)
+                    continue
+                except SessionExpired:
+                    print("🔒 Saved session has expired; falling back to the browser")
+                    sessions.invalidate()
+                    use_http = False
+                except MissingNoteTable:
+                    print(f"⚠️ No note table in the HTML of {url}; reading it in the browser")
+            if driver is None:
+                driver = create_driver()
+                with recorder.phase("login"):
+                    login(driver, sessions)
+            scrape_job(driver, url, downloader, ledger, recorder, consumers, resolver)
         except Exception as e:
-            print(f"Error processing job: {e}")
-            with open('failed_urls.csv', 'a') as f:
-                f.write(f"{url}\n")
+            fail_job(ledger, url, e)
+
+    if driver is not None:
+        driver.quit()
+
+
+def run_pool(workers, job_urls, downloader, ledger, recorder, sessions, consumers=(), resolver=None):
+    """Process the job URLs in parallel, one browser per worker."""
+    print(f"🚀 Starting {workers} browser workers...")
+    pipeline = create_pipeline(downloader, ledger, recorder, consumers, resolver)
+    if pipeline is not None:
+        process_job = lambda driver, url: extract_stage(driver, url, downloader, ledger, recorder)
+        hand_off = pipeline.put
+    else:
+        process_job = lambda driver, url: scrape_job(driver, url, downloader, ledger, recorder, consumers, resolver)
+        hand_off = None
+    pool = BrowserPool(
+        create_driver=lambda: create_worker_driver(sessions),
+        process_job=process_job,
+        workers=workers,
+        job_timeout=config_geoop.JOB_TIMEOUT,
+        recycle=create_recycle_policy(),
+        hand_off=hand_off,
+    )
+    try:
+        results = pool.run(job_urls, on_failure=ledger.fail_job)
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+    if pipeline is None:
+        print(f"✅ {len(results)} jobs completed")
+
+
+def run_daemon(workers, downloader, ledger, recorder, sessions, consumers=(), resolver=None):
+    """Keep logged-in browsers running and process the jobs --attach runs submit, until stopped."""
+    def log_in():
+        driver = create_driver()
+        try:
+            with recorder.phase("login"):
+                login(driver, sessions)
+        finally:
+            driver.quit()
+
+    if not sessions.is_valid():
+        log_in()
+
+    def check_session():
+        # The login can expire while the daemon sits idle between batches
+        sessions.invalidate()
+        if not sessions.is_valid():
+            log_in()
+            daemon.pool.renew()
+
+    def process_job(driver, url):
+        result = scrape_job(driver, url, downloader, ledger, recorder, consumers, resolver)
+        # Commit now so --attach runs see the job as done straight away
+        ledger.flush()
+        return result
+
+    def on_failure(url, error):
+        ledger.fail_job(url, error)
+        ledger.flush()
+
+    daemon = BrowserDaemon(
+        create_driver=lambda: create_worker_driver(sessions),
+        process_job=process_job,
+        workers=workers,
+        job_timeout=config_geoop.JOB_TIMEOUT,
+        recycle=create_recycle_policy(),
+        on_failure=on_failure,
+        skip=None if config_geoop.INCREMENTAL else ledger.is_done,
+        before_batch=check_session,
+        host=config_geoop.DAEMON_HOST,
+        port=config_geoop.DAEMON_PORT,
+    )
+    daemon.serve_forever()
+
+
+def attach(job_urls):
+    """Hand the job URLs to a running browser daemon and report each one as it finishes."""
+    failed = 0
+    try:
+        for reply in submit(job_urls, config_geoop.DAEMON_HOST, config_geoop.DAEMON_PORT):
+            if reply["skipped"]:
+                print(f"⏭️ {reply['url']} was already done")
+            elif reply["ok"]:
+                print(f"✅ {reply['url']}")
+            else:
+                failed += 1
+                print(f"❌ {reply['url']}: {reply['error']}")
+    except ConnectionRefusedError:
+        print(f"⚠️ No browser daemon on {config_geoop.DAEMON_HOST}:{config_geoop.DAEMON_PORT}; "
+              "start one with: python scraper.py --daemon")
+        return
+    print(f"✅ Daemon finished {len(job_urls)} job(s), {failed} failed")
+
+
+def stop_daemon():
+    try:
+        for reply in send_command({"command": "shutdown"}, config_geoop.DAEMON_HOST, config_geoop.DAEMON_PORT):
+            print("🛑 Browser daemon is shutting down")
+    except ConnectionRefusedError:
+        print("⚠️ No browser daemon is running")
+
+
+def show_failed(ledger):
+    """Print the jobs whose last attempt failed."""
+    failed = ledger.failed_jobs()
+    for url, attempts, last_error in failed:
+        print(f"{url}\t{attempts} attempt(s)\t{last_error}")
+    print(f"❌ {len(failed)} failed job(s)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape GeoOp jobs, notes and attachments.")
+    parser.add_argument("--workers", type=int, default=config_geoop.BROWSER_WORKERS,
+                        help="number of browsers processing jobs in parallel")
+    parser.add_argument("--no-browser", action="store_true",
+                        help="fetch jobs over HTTP with cookies.json; the browser is only used if the session expired")
+    parser.add_argument("--discover", action="store_true",
+                        help="crawl the GeoOp job list for job URLs instead of using JOB_URLS_LIST")
+    parser.add_argument("--show-browser", action="store_true",
+                        help="open a visible Chrome window instead of running headless (e.g. to complete 2FA)")
+    parser.add_argument("--profile-job", metavar="URL",
+                        help="run this one job under a profiler (pyinstrument if installed, else cProfile)")
+    parser.add_argument("--show-failed", action="store_true",
+                        help="list the failed jobs recorded in the run ledger and exit")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep --workers logged-in browsers warm and process jobs sent by --attach runs")
+    parser.add_argument("--attach", action="store_true",
+                        help="send the pending jobs to a running --daemon instead of starting Chrome")
+    parser.add_argument("--stop-daemon", action="store_true", help="shut down a running --daemon")
+    parser.add_argument("--queue", nargs="?", const=config_geoop.WORK_QUEUE_FILE, metavar="FILE",
+                        help="lease jobs from a shared queue filled by `python -m utils.work_queue load` "
+                             "(default file: WORK_QUEUE_FILE), so several nodes can split a run")
+    parser.add_argument("--incremental", action="store_true",
+                        help="revisit finished jobs too, saving only notes newer than each job's last run")
+    parser.add_argument("--capture-snapshots", action="store_true",
+                        help="save each job's rendered pages to SNAPSHOT_FOLDER for `python -m utils.snapshots replay`")
+    args = parser.parse_args()
+    if args.queue and (args.discover or args.attach or args.daemon):
+        parser.error("--queue can't be combined with --discover, --attach or --daemon")
+    if args.attach and args.discover:
+        parser.error("--attach sends JOB_URLS_LIST; it can't be combined with --discover")
+    return args
 
-    print("✅ Finished scraping jobs!")
 
-    # Remove or comment out the driver.quit() line
-    driver.quit()  
+def main():
+    args = parse_args()
+    if args.show_browser:
+        config_geoop.HEADLESS = False
+    if args.capture_snapshots:
+        config_geoop.SNAPSHOT_CAPTURE = True
+    if args.incremental:
+        config_geoop.INCREMENTAL = True
+    if config_geoop.INCREMENTAL and config_geoop.ARCHIVE_OUTPUT:
+        raise SystemExit("Incremental runs add files to the job folders; turn ARCHIVE_OUTPUT off to use them")
+    ledger = RunLedger(config_geoop.LEDGER_FILE, batch_size=config_geoop.LEDGER_BATCH_SIZE)
+    if args.show_failed:
+        show_failed(ledger)
+        ledger.close()
+        return
+    if args.stop_daemon:
+        stop_daemon()
+        ledger.close()
+        return
+
+    work_queue = None
+    if args.queue:
+        work_queue = create_work_queue(args.queue)
+        ledger = QueuedLedger(ledger, work_queue)
+        job_urls = work_queue.iter_leased(batch=args.workers, poll_seconds=config_geoop.QUEUE_POLL_SECONDS)
+    elif config_geoop.INCREMENTAL and not args.discover:
+        # Finished jobs are refreshed too; each only handles what is new since its mark
+        job_urls = list(urls)
+        print(f"📋 {len(job_urls)} job(s) to refresh")
+    elif not args.discover:
+        job_urls = ledger.pending(urls)
+        print(f"📋 {len(job_urls)} job(s) to process, {len(urls) - len(job_urls)} already done")
+    if args.attach:
+        ledger.close()
+        attach(job_urls)
+        return
+    downloader = create_downloader()
+    recorder = MetricsRecorder(config_geoop.METRICS_FILE, profile_url=args.profile_job)
+    sessions = create_sessions()
+    consumers = create_consumers()
+    resolver = create_resolver()
 
-    # # Add this to keep the script running
-    # try:
-    #     input("Press Enter to close the browser...")
-    # finally:
-    #     driver.quit()
+    try:
+        if resolver is not None and not args.discover and not args.daemon and not args.queue:
+            prefetch_companies(resolver, consumers, job_urls)
+        if args.daemon:
+            run_daemon(args.workers, downloader, ledger, recorder, sessions, consumers, resolver)
+        elif args.no_browser and not args.discover:
+            run_http(job_urls, downloader, ledger, recorder, sessions, consumers, resolver)
+        else:
+            driver = create_driver()
+
+            # ---------------------
+            # 1) Login to GeoOp
+            # ---------------------
+            with recorder.phase("login"):
+                login(driver, sessions)
+
+            # ---------------------
+            if args.discover:
+                # This browser crawls the job list while the workers process what it finds
+                job_urls = discover_job_urls(
+                    driver, config_geoop.JOBS_URL, config_geoop.DISCOVERY_CHECKPOINT, ledger,
+                    skip=None if config_geoop.INCREMENTAL else ledger.is_done,
+                )
+                if args.no_browser:
+                    run_http(job_urls, downloader, ledger, recorder, sessions, consumers, resolver)
+                else:
+                    run_pool(args.workers, job_urls, downloader, ledger, recorder, sessions, consumers, resolver)
+            elif args.workers > 1:
+                # The workers start their own browsers from the saved cookies
+                driver.quit()
+                driver = None
+                run_pool(args.workers, job_urls, downloader, ledger, recorder, sessions, consumers, resolver)
+            else:
+                driver = run_serial(driver, job_urls, downloader, ledger, recorder, sessions, consumers, resolver)
+            if driver is not None:
+                driver.quit()
+
+        print("✅ Finished scraping jobs!")
+        recorder.summary()
+    finally:
+        for consumer in consumers:
+            consumer.close()
+        if resolver is not None:
+            resolver.close()
+        downloader.close()
+        ledger.close()
+        if work_queue is not None:
+            work_queue.close()
+        recorder.close()
 
 
 
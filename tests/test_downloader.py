@@ -0,0 +1,146 @@
+# tests/test_downloader.py
+# The downloader's resume and revalidation paths against a local server:
+# Range resumes of a .part file, If-Range when the file changed underneath,
+# and If-None-Match answered with a 304.
+#
+#   python -m unittest tests.test_downloader
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from utils.downloader import Downloader
+    from utils.validator_cache import ValidatorCache
+except ImportError:  # requests isn't installed
+    Downloader = None
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Serves server.body at any path, honouring Range/If-Range and If-None-Match."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        body = server.body
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        server.requests.append(dict(self.headers))
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start, status = 0, 200
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", etag) == etag:
+            start, status = int(match.group(1)), 206
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(body[start:])
+        server.bytes_sent += len(body) - start
+
+
+@unittest.skipIf(Downloader is None, "the downloader needs requests")
+class DownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+        self.server.body = bytes(range(256)) * 400
+        self.server.requests = []
+        self.server.bytes_sent = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address[:2]
+        self.url = f"http://{host}:{port}/files/1/photo.jpg?signature=abc"
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "photo.jpg")
+        self.validators = ValidatorCache(os.path.join(self.folder.name, "validators.db"))
+        self.downloader = Downloader(max_workers=2, validators=self.validators)
+
+    def tearDown(self):
+        self.downloader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.folder.cleanup()
+
+    def etag(self, body):
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def leave_partial(self, body, kept, etag):
+        """What an interrupted attempt leaves behind: the first kept bytes and the response's metadata."""
+        with open(f"{self.path}.part", "wb") as f:
+            f.write(body[:kept])
+        with open(f"{self.path}.part.json", "w") as f:
+            json.dump({"etag": etag, "total": len(body)}, f)
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_full_download(self):
+        self.assertTrue(self.downloader.download(self.url, self.path))
+        self.assertEqual(self.read(), self.server.body)
+        self.assertFalse(os.path.exists(f"{self.path}.part"))
+        self.assertFalse(os.path.exists(f"{self.path}.part.json"))
+
+    def test_partial_file_is_resumed_with_range(self):
+        body = self.server.body
+        self.leave_partial(body, 40_000, self.etag(body))
+
+        self.assertTrue(self.downloader.download(self.url, self.path))
+        self.assertEqual(self.read(), body)
+        request = self.server.requests[-1]
+        self.assertEqual(request["Range"], "bytes=40000-")
+        self.assertEqual(request["If-Range"], self.etag(body))
+        self.assertEqual(self.server.bytes_sent, len(body) - 40_000)
+
+    def test_changed_file_is_downloaded_whole_despite_the_partial(self):
+        old = b"x" * len(self.server.body)
+        self.leave_partial(old, 40_000, self.etag(old))
+
+        self.assertTrue(self.downloader.download(self.url, self.path))
+        # If-Range didn't match, so the server sent the new file whole
+        self.assertEqual(self.read(), self.server.body)
+        self.assertEqual(self.server.bytes_sent, len(self.server.body))
+
+    def test_unchanged_file_is_revalidated_with_a_304(self):
+        self.assertTrue(self.downloader.download(self.url, self.path))
+        sent = self.server.bytes_sent
+
+        resigned = self.url.replace("signature=abc", "signature=def")
+        self.assertTrue(self.downloader.download(resigned, self.path))
+        self.assertEqual(self.server.requests[-1]["If-None-Match"], self.etag(self.server.body))
+        self.assertEqual(self.server.bytes_sent, sent)
+        self.assertEqual(self.read(), self.server.body)
+
+    def test_304_reuses_the_earlier_copy_at_a_new_path(self):
+        self.assertTrue(self.downloader.download(self.url, self.path))
+        other = os.path.join(self.folder.name, "renamed.jpg")
+
+        self.assertTrue(self.downloader.download(self.url, other))
+        self.assertEqual(self.server.requests[-1]["If-None-Match"], self.etag(self.server.body))
+        with open(other, "rb") as f:
+            self.assertEqual(f.read(), self.server.body)
+
+    def test_changed_file_is_fetched_again_after_revalidation(self):
+        self.assertTrue(self.downloader.download(self.url, self.path))
+        self.server.body = b"new contents" * 1000
+
+        self.assertTrue(self.downloader.download(self.url, self.path))
+        self.assertEqual(self.read(), self.server.body)
+
+
+if __name__ == "__main__":
+    unittest.main()
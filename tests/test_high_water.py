@@ -0,0 +1,112 @@
+# tests/test_high_water.py
+# High-water marks decide which note rows an --incremental run never saves
+# again, so each case that has gone wrong before is pinned down here.
+#
+#   python -m unittest tests.test_high_water
+import unittest
+
+from utils.high_water import advance, is_new, new_rows, reached, row_key
+
+
+def photo(day, time, n, signature="abc"):
+    return {
+        "date": f"{day:02d} Mar 2024 {time}",
+        "url": f"https://files.geoop.com/jobs/1/{n}.jpg?signature={signature}",
+        "note": None,
+    }
+
+
+def note(date, text):
+    return {"date": date, "url": None, "note": text}
+
+
+class MarkTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = [photo(1, "09:00 am", 1), photo(2, "10:04 am", 2), photo(3, "11:30 am", 3)]
+        self.mark = advance(None, self.saved, next_index=3)
+
+    def test_advance_records_the_newest_note(self):
+        self.assertEqual(self.mark["note_date"], "2024-03-03T11:30:00")
+        self.assertEqual(self.mark["row_keys"], [row_key(self.saved[2])])
+        self.assertEqual(self.mark["next_index"], 3)
+
+    def test_no_mark_means_every_row_is_new(self):
+        self.assertEqual(new_rows(self.saved, None), self.saved)
+        self.assertFalse(reached(self.saved, None))
+
+    def test_only_newer_rows_are_new(self):
+        newer = photo(4, "08:00 am", 4)
+        self.assertEqual(new_rows(self.saved + [newer], self.mark), [newer])
+
+    def test_same_minute_rows_are_told_apart(self):
+        # Two attachments posted in the same minute as the mark's newest note
+        same_minute = photo(3, "11:30 am", 5)
+        self.assertTrue(is_new(same_minute, self.mark))
+        self.assertFalse(is_new(self.saved[2], self.mark))
+
+        mark = advance(self.mark, [same_minute], next_index=4)
+        self.assertEqual(mark["note_date"], self.mark["note_date"])
+        self.assertEqual(sorted(mark["row_keys"]), sorted([row_key(self.saved[2]), row_key(same_minute)]))
+        self.assertEqual(new_rows(self.saved + [same_minute], mark), [])
+
+    def test_resigned_url_is_the_same_row(self):
+        resigned = photo(3, "11:30 am", 3, signature="fresh-signature")
+        self.assertEqual(row_key(resigned), row_key(self.saved[2]))
+        self.assertFalse(is_new(resigned, self.mark))
+
+    def test_text_notes_are_keyed_by_date_and_text(self):
+        first = note("03 Mar 2024 11:30 am", "Filters swapped")
+        second = note("03 Mar 2024 11:30 am", "Customer signed off")
+        self.assertNotEqual(row_key(first), row_key(second))
+        mark = advance(self.mark, [first], next_index=4)
+        self.assertEqual(new_rows([first, second], mark), [second])
+
+
+class UndatedRowsTest(unittest.TestCase):
+    def test_undated_rows_are_saved_once(self):
+        undated = note("sometime last week", "Left a card")
+        self.assertEqual(new_rows([undated], advance(None, [photo(1, "09:00 am", 1)], 1)), [undated])
+
+        mark = advance(None, [photo(1, "09:00 am", 1), undated], next_index=2)
+        self.assertEqual(mark["undated_keys"], [row_key(undated)])
+        self.assertEqual(new_rows([undated], mark), [])
+
+    def test_only_undated_rows_still_make_a_mark(self):
+        undated = note("", "No date on this one")
+        mark = advance(None, [undated], next_index=1)
+        self.assertIsNotNone(mark)
+        self.assertEqual(mark["note_date"], "")
+        self.assertFalse(is_new(undated, mark))
+        self.assertTrue(is_new(photo(1, "09:00 am", 1), mark))
+
+    def test_mark_from_an_older_ledger_has_no_undated_keys(self):
+        mark = {"note_date": "2024-03-03T11:30:00", "row_keys": [], "next_index": 3}
+        self.assertTrue(is_new(note(None, "text"), mark))
+        self.assertIn("undated_keys", advance(mark, [], next_index=3))
+
+
+class ReachedTest(unittest.TestCase):
+    def setUp(self):
+        self.mark = advance(None, [photo(2, "10:04 am", 2)], next_index=3)
+
+    def test_newest_first_stops_once_the_last_row_is_covered(self):
+        loaded = [photo(5, "09:00 am", 5), photo(4, "09:00 am", 4), photo(2, "10:04 am", 2)]
+        self.assertTrue(reached(loaded, self.mark))
+
+    def test_newest_first_keeps_scrolling_while_the_last_row_is_new(self):
+        loaded = [photo(5, "09:00 am", 5), photo(4, "09:00 am", 4)]
+        self.assertFalse(reached(loaded, self.mark))
+
+    def test_oldest_first_always_loads_everything(self):
+        # The covered rows come first and the new ones are further down
+        loaded = [photo(1, "09:00 am", 1), photo(2, "10:04 am", 2)]
+        self.assertFalse(reached(loaded, self.mark))
+        self.assertFalse(reached(loaded + [photo(3, "09:00 am", 3)], self.mark))
+
+    def test_order_unknown_keeps_scrolling(self):
+        self.assertFalse(reached([photo(2, "10:04 am", 2)], self.mark))
+        self.assertFalse(reached([], self.mark))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# tests/test_work_queue.py
+# Several worker processes sharing one queue file, one of which dies while
+# holding leases: every job must still be done exactly once.
+#
+#   python -m unittest tests.test_work_queue
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from utils.work_queue import DONE, WorkQueue
+
+JOBS = 60
+LEASE_SECONDS = 1
+
+
+def run_worker(path, log_path, worker_id):
+    """Lease jobs until the queue is empty, writing "<worker> <url>" to the log for each one processed."""
+    work_queue = WorkQueue(path, lease_seconds=LEASE_SECONDS, worker_id=worker_id)
+    work_queue.start_heartbeat()
+    try:
+        for url in work_queue.iter_leased(batch=2, poll_seconds=0.2):
+            with open(log_path, "a") as f:
+                f.write(f"{worker_id} {url}\n")
+            work_queue.complete(url)
+    finally:
+        work_queue.close()
+
+
+def die_holding_leases(path, leased, worker_id):
+    """Lease a few jobs, report them, and exit without completing or releasing them."""
+    work_queue = WorkQueue(path, lease_seconds=LEASE_SECONDS, worker_id=worker_id)
+    leased.extend(work_queue.lease(5))
+    os._exit(1)
+
+
+class WorkQueueWorkersTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "work_queue.db")
+        self.log_path = os.path.join(self.folder.name, "processed.log")
+        self.urls = [f"https://app.geoop.com/jobs/{n}" for n in range(JOBS)]
+        coordinator = WorkQueue(self.path)
+        coordinator.add(self.urls)
+        coordinator.close()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_jobs_done_once_when_a_worker_dies_mid_lease(self):
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager:
+            leased = manager.list()
+            dying = context.Process(target=die_holding_leases, args=(self.path, leased, "dying"))
+            dying.start()
+            dying.join(30)
+            self.assertEqual(dying.exitcode, 1)
+            abandoned = list(leased)
+        self.assertEqual(len(abandoned), 5)
+
+        workers = [
+            context.Process(target=run_worker, args=(self.path, self.log_path, f"worker-{n}"))
+            for n in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            self.assertEqual(worker.exitcode, 0)
+
+        with open(self.log_path) as f:
+            processed = [line.split() for line in f]
+        processed_urls = [url for _, url in processed]
+        self.assertCountEqual(processed_urls, self.urls)
+        self.assertEqual(len(processed_urls), len(set(processed_urls)))
+
+        conn = sqlite3.connect(self.path)
+        try:
+            states = dict(conn.execute("SELECT url, state FROM queue"))
+            attempts = dict(conn.execute("SELECT url, attempts FROM queue"))
+        finally:
+            conn.close()
+        self.assertTrue(all(state == DONE for state in states.values()))
+        # The dead worker's jobs were leased again once its leases ran out
+        for url in abandoned:
+            self.assertEqual(attempts[url], 2)
+        self.assertNotIn("dying", {worker for worker, _ in processed})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+
+from utils.file_manager import file_sha256
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXTENSIONS = {"zip": ".zip", "tar": ".tar", "tar.zst": ".tar.zst"}
+
+# Already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".pdf", ".zip", ".mp4", ".mov"}
+
+
+class ArchiveWriter:
+    """
+    Packs each saved job into one archive next to where its folder would be
+    (output/<job id>/<client>.zip, .tar or .tar.zst) and removes the loose
+    files, so a backfill leaves one file per job instead of one per attachment.
+    Paths inside the archive are the same as under output/, and manifest.json
+    (job details plus every file's URL, description, size and SHA-256) is
+    written last.
+
+    The archive is written to <name>.part and only renamed once complete, so a
+    leftover .part file marks a job that was interrupted; the run ledger still
+    has that job as not done and the next run writes it again from scratch.
+
+    With an AttachmentIndex, the index rows of the archived files are pointed
+    at the archive and their member names before the loose files are removed.
+    """
+
+    def __init__(self, fmt="zip", base_folder="output", index=None):
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Unknown archive format {fmt!r}; use one of {', '.join(EXTENSIONS)}")
+        if fmt == "tar.zst" and zstandard is None:
+            raise RuntimeError('ARCHIVE_OUTPUT = "tar.zst" needs `pip install zstandard`')
+        self.fmt = fmt
+        self.base_folder = base_folder
+        self.index = index
+        self.archives = 0
+
+    def archive_path(self, folder_path):
+        return folder_path.rstrip(os.sep) + EXTENSIONS[self.fmt]
+
+    def job_saved(self, saved):
+        files = [f for f in saved["files"] if os.path.exists(f["path"])]
+        target = self.archive_path(saved["folder_path"])
+        part = target + ".part"
+        manifest = {
+            "job_url": saved["job_url"],
+            "job_id": saved["job_id"],
+            "client_name": saved["client_name"],
+            "service_name": saved["service_name"],
+            "visit_date": saved["visit_date"],
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": [
+                {
+                    "path": self._arcname(f["path"]),
+                    "url": f["url"],
+                    "description": f["description"],
+                    "note_date": f["note_date"],
+                    "size": os.path.getsize(f["path"]),
+                    "sha256": file_sha256(f["path"]),
+                }
+                for f in files
+            ],
+        }
+        manifest_bytes = json.dumps(manifest, indent=2).encode("utf-8")
+
+        if self.fmt == "zip":
+            self._write_zip(part, files, manifest_bytes)
+        else:
+            self._write_tar(part, files, manifest_bytes)
+        os.replace(part, target)
+        if self.index is not None:
+            self.index.archived(target, {f["path"]: self._arcname(f["path"]) for f in files})
+
+        for f in files:
+            os.remove(f["path"])
+        self._remove_empty_folders(saved["folder_path"])
+        self.archives += 1
+        print(f"📦 Archived {len(files)} file(s) to {target}")
+
+    def _arcname(self, path):
+        return os.path.relpath(path, self.base_folder).replace(os.sep, "/")
+
+    def _write_zip(self, part, files, manifest_bytes):
+        with zipfile.ZipFile(part, "w") as archive:
+            for f in files:
+                stored = os.path.splitext(f["path"])[1].lower() in STORED_EXTENSIONS
+                compression = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                archive.write(f["path"], self._arcname(f["path"]), compress_type=compression)
+            archive.writestr("manifest.json", manifest_bytes, compress_type=zipfile.ZIP_DEFLATED)
+
+    def _write_tar(self, part, files, manifest_bytes):
+        with open(part, "wb") as raw:
+            if self.fmt == "tar.zst":
+                stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+            else:
+                stream = raw
+            # "w|" writes the tar as a stream, one member after another
+            with tarfile.open(fileobj=stream, mode="w|") as archive:
+                for f in files:
+                    archive.add(f["path"], self._arcname(f["path"]))
+                info = tarfile.TarInfo("manifest.json")
+                info.size = len(manifest_bytes)
+                info.mtime = int(time.time())
+                archive.addfile(info, io.BytesIO(manifest_bytes))
+            if stream is not raw:
+                stream.close()
+
+    def _remove_empty_folders(self, folder_path):
+        """Remove the job folder tree if archiving left it empty; anything else (e.g. .part downloads) stays."""
+        for root, _, _ in sorted(os.walk(folder_path), key=lambda entry: len(entry[0]), reverse=True):
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+    def close(self):
+        print(f"📦 {self.archives} job archive(s) written")
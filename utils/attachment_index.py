@@ -0,0 +1,218 @@
+# utils/attachment_index.py
+# SQLite index of every file the scraper saves, filled in as jobs are written,
+# so lookups don't have to walk output/. Query it from the command line:
+#
+#   python -m utils.attachment_index --client "Acme" --type pdf --since 2024-01-01 --until 2024-03-31
+#   python -m utils.attachment_index --job 50503817
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    job_id TEXT,
+    job_url TEXT,
+    client TEXT,
+    service TEXT,
+    visit_date TEXT,
+    note_date TEXT,
+    note_date_text TEXT,
+    url TEXT,
+    description TEXT,
+    size INTEGER,
+    type TEXT,
+    archive TEXT,
+    member TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_client ON files (client COLLATE NOCASE, note_date);
+CREATE INDEX IF NOT EXISTS files_job ON files (job_id);
+CREATE INDEX IF NOT EXISTS files_job_url ON files (job_url);
+CREATE INDEX IF NOT EXISTS files_type_date ON files (type, note_date);
+"""
+
+# GeoOp writes note dates like "01 Mar 2024 10:04 am"
+NOTE_DATE_FORMATS = ("%d %b %Y %I:%M %p", "%d %b %Y %H:%M", "%d %b %Y")
+
+COLUMNS = ("job_id", "client", "service", "visit_date", "note_date", "type", "size", "path", "url", "archive", "member")
+
+
+def parse_note_datetime(text):
+    """Return the note's date and time as a datetime, or None if it isn't in a known format."""
+    if not text:
+        return None
+    for fmt in NOTE_DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_note_date(text):
+    """Return the note's date as YYYY-MM-DD, or None if it isn't in a known format."""
+    parsed = parse_note_datetime(text)
+    return parsed.date().isoformat() if parsed else None
+
+
+def file_type(path):
+    """Lower-case extension without the dot ("pdf", "jpg", "txt" for text notes)."""
+    return os.path.splitext(path)[1].lstrip(".").lower() or None
+
+
+class AttachmentIndex:
+    """
+    One row per saved file with the job, client, service, visit and note dates,
+    source URL, size and type. Rows are written as each job is saved (one
+    commit per job), keyed by path, so reruns update rather than duplicate.
+    Once an ArchiveWriter has packed a job, its rows also name the archive
+    and the file's member name inside it, as the loose path is gone.
+    """
+
+    def __init__(self, path="output/index.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        for column in ("archive", "member"):
+            if column not in columns:
+                # Indexes written before archived files were tracked
+                self._conn.execute(f"ALTER TABLE files ADD COLUMN {column} TEXT")
+        self._lock = threading.Lock()
+
+    def job_saved(self, saved):
+        now = time.time()
+        rows = [
+            (
+                f["path"], saved["job_id"], saved["job_url"], saved["client_name"], saved["service_name"],
+                saved["visit_date"], parse_note_date(f["note_date"]), f["note_date"], f["url"],
+                f["description"], os.path.getsize(f["path"]), file_type(f["path"]), now,
+            )
+            for f in saved["files"]
+            if os.path.exists(f["path"])
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, job_id, job_url, client, service, visit_date, note_date, "
+                "note_date_text, url, description, size, type, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def archived(self, archive, members):
+        """Record that the files at the paths in members ({path: member name}) now live only in archive."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE files SET archive = ?, member = ? WHERE path = ?",
+                [(archive, member, path) for path, member in members.items()],
+            )
+            self._conn.commit()
+
+    def find(self, client=None, job_id=None, extension=None, since=None, until=None, text=None, limit=None):
+        """
+        Return matching rows ordered by note date. client and text match
+        substrings (case-insensitive); since/until are inclusive YYYY-MM-DD.
+        """
+        clauses, params = [], []
+        if client:
+            clauses.append("client LIKE ?")
+            params.append(f"%{client}%")
+        if job_id:
+            clauses.append("job_id = ?")
+            params.append(str(job_id))
+        if extension:
+            clauses.append("type = ?")
+            params.append(extension.lower().lstrip("."))
+        if since:
+            clauses.append("note_date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("note_date <= ?")
+            params.append(until)
+        if text:
+            clauses.append("(description LIKE ? OR service LIKE ?)")
+            params += [f"%{text}%", f"%{text}%"]
+
+        sql = "SELECT * FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY note_date, path"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def clients(self, job_urls=None):
+        """Distinct client names in the index, or only those of the given jobs."""
+        sql = "SELECT DISTINCT client FROM files WHERE client IS NOT NULL AND client != ''"
+        if job_urls is None:
+            with self._lock:
+                return sorted(row[0] for row in self._conn.execute(sql))
+        job_urls = list(job_urls)
+        clients = set()
+        # Chunked to stay under SQLite's limit on bound parameters
+        for start in range(0, len(job_urls), 500):
+            chunk = job_urls[start:start + 500]
+            with self._lock:
+                rows = self._conn.execute(f"{sql} AND job_url IN ({', '.join('?' * len(chunk))})", chunk)
+                clients.update(row[0] for row in rows)
+        return sorted(clients)
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Look up saved GeoOp files in the attachment index.")
+    parser.add_argument("--index", default=None, help="index file (default: ATTACHMENT_INDEX_FILE)")
+    parser.add_argument("--client", help="client name contains this text")
+    parser.add_argument("--job", help="GeoOp job number")
+    parser.add_argument("--type", help="file extension, e.g. pdf or jpg (txt for text notes)")
+    parser.add_argument("--since", help="note date on or after YYYY-MM-DD")
+    parser.add_argument("--until", help="note date on or before YYYY-MM-DD")
+    parser.add_argument("--text", help="description or service contains this text")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--paths", action="store_true",
+                        help="print only the file paths (<archive>::<member> for archived files)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    path = args.index
+    if path is None:
+        import config_geoop
+        path = config_geoop.ATTACHMENT_INDEX_FILE
+    if not os.path.exists(path):
+        sys.exit(f"No attachment index at {path}; it is created as the scraper saves jobs")
+
+    index = AttachmentIndex(path)
+    start = time.monotonic()
+    rows = index.find(client=args.client, job_id=args.job, extension=args.type,
+                      since=args.since, until=args.until, text=args.text, limit=args.limit)
+    elapsed_ms = (time.monotonic() - start) * 1000
+    index.close()
+
+    for row in rows:
+        if args.paths:
+            print(f"{row['archive']}::{row['member']}" if row["archive"] else row["path"])
+        else:
+            print("\t".join("" if row[column] is None else str(row[column]) for column in COLUMNS))
+    print(f"🔎 {len(rows)} file(s) in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
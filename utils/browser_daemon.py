@@ -0,0 +1,173 @@
+import json
+import queue
+import socket
+import socketserver
+import threading
+
+from utils.browser_pool import BrowserPool
+
+
+class Submission:
+    """One job URL sent by a client, and the queue its outcome is reported on."""
+
+    def __init__(self, url, replies):
+        self.url = url
+        self.replies = replies
+
+    def __str__(self):
+        return self.url
+
+    def reply(self, ok, result=None, error=None, skipped=False):
+        self.replies.put({"url": self.url, "ok": ok, "skipped": skipped,
+                          "result": result, "error": str(error) if error else None})
+
+
+class BrowserDaemon:
+    """
+    Keeps logged-in browsers warm between scraper runs. Clients connect to
+    host:port, send one JSON line such as {"urls": [...]}, and get one JSON
+    line back per job as it finishes. {"command": "status"} and
+    {"command": "shutdown"} are also understood.
+
+    The jobs themselves run on a BrowserPool with warm=True, so crashed or
+    oversized browsers are replaced (and warmed again) exactly as in a normal
+    parallel run. before_batch() is called before each client's URLs are
+    queued, e.g. to check the login is still good after a quiet spell.
+    """
+
+    def __init__(self, create_driver, process_job, workers=1, job_timeout=600, recycle=None,
+                 on_failure=None, skip=None, before_batch=None, host="127.0.0.1", port=8765):
+        self.process_job = process_job
+        self.on_failure = on_failure
+        self.skip = skip
+        self.before_batch = before_batch
+        self.host = host
+        self.port = port
+        self.submissions = queue.Queue()
+        # Outcomes go straight back to the client, so the pool never collects results
+        self.pool = BrowserPool(
+            create_driver=create_driver,
+            process_job=self._process,
+            workers=workers,
+            job_timeout=job_timeout,
+            recycle=recycle,
+            warm=True,
+            hand_off=self._finished,
+        )
+        self._server = None
+        self._batch_lock = threading.Lock()
+
+    def serve_forever(self):
+        daemon = self
+
+        class Handler(BrowserDaemonHandler):
+            browser_daemon = daemon
+
+        # Workers start their browsers now so the first submitted job doesn't wait for Chrome
+        pool_thread = threading.Thread(
+            target=self.pool.run,
+            args=(iter(self.submissions.get, None),),
+            kwargs={"on_failure": self._failed},
+            name="browser-daemon-pool",
+        )
+        pool_thread.start()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        print(f"🟢 Browser daemon listening on {self.host}:{self.port} with {self.pool.workers} browser(s)")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            self.submissions.put(None)
+            pool_thread.join()
+            print("🛑 Browser daemon stopped")
+
+    def shutdown(self):
+        # serve_forever() must be stopped from another thread than the one running it
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def submit(self, urls):
+        """Queue urls; returns the queue their replies arrive on, one per URL."""
+        replies = queue.Queue()
+        if self.before_batch and urls:
+            try:
+                with self._batch_lock:
+                    self.before_batch()
+            except Exception as e:
+                print(f"⚠️ Could not prepare for the batch: {e}")
+                for url in urls:
+                    Submission(url, replies).reply(False, error=e)
+                return replies
+        for url in urls:
+            submission = Submission(url, replies)
+            if self.skip and self.skip(url):
+                submission.reply(True, skipped=True)
+            else:
+                self.submissions.put(submission)
+        return replies
+
+    def status(self):
+        return {"workers": self.pool.workers, "queued": self.submissions.qsize() + self.pool.urls.qsize()}
+
+    def _process(self, driver, submission):
+        return submission, self.process_job(driver, submission.url)
+
+    @staticmethod
+    def _finished(outcome):
+        submission, result = outcome
+        submission.reply(True, result=result)
+
+    def _failed(self, submission, error):
+        if self.on_failure:
+            self.on_failure(submission.url, error)
+        submission.reply(False, error=error)
+
+
+class BrowserDaemonHandler(socketserver.StreamRequestHandler):
+    browser_daemon = None
+
+    def handle(self):
+        daemon = self.browser_daemon
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return self._send({"error": "expected one JSON line"})
+
+        command = request.get("command")
+        if command == "status":
+            return self._send(daemon.status())
+        if command == "shutdown":
+            self._send({"ok": True})
+            return daemon.shutdown()
+
+        urls = request.get("urls") or []
+        replies = daemon.submit(urls)
+        for _ in urls:
+            self._send(replies.get(), default=str)
+
+    def _send(self, message, default=None):
+        self.wfile.write((json.dumps(message, default=default) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+def send_command(request, host="127.0.0.1", port=8765, timeout=2):
+    """
+    Send one request to a running daemon and yield each JSON reply line.
+    Raises ConnectionRefusedError (an OSError) if no daemon is listening.
+    """
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        # Jobs can take minutes; only the connect itself should time out quickly
+        connection.settimeout(None)
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with connection.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                yield json.loads(line)
+
+
+def submit(urls, host="127.0.0.1", port=8765):
+    """Send job URLs to a running daemon and yield one reply dict per job as it finishes."""
+    return send_command({"urls": list(urls)}, host, port)
@@ -0,0 +1,206 @@
+import queue
+import threading
+
+from selenium.common.exceptions import InvalidSessionIdException
+
+# Error text of a WebDriver call whose browser or chromedriver has gone away
+DEAD_BROWSER_MESSAGES = (
+    "invalid session id",
+    "session deleted",
+    "chrome not reachable",
+    "target window already closed",
+    "disconnected",
+    "connection refused",
+    "max retries exceeded",
+)
+
+
+def browser_died(error):
+    """
+    Whether error means the browser itself is gone (dead session, chromedriver
+    not answering), as opposed to a page problem such as a missing or stale
+    element or a script error, which leaves the browser usable.
+    """
+    if isinstance(error, (InvalidSessionIdException, ConnectionError)):
+        return True
+    text = str(error).lower()
+    return any(message in text for message in DEAD_BROWSER_MESSAGES)
+
+
+class BrowserPool:
+    """
+    Runs jobs across several browsers at once. Each worker owns one driver and
+    pulls URLs off a shared queue; a driver that crashes or hangs past
+    job_timeout is quit and replaced, and the URL is retried on the new one.
+
+    The URLs may come from a generator: a feeder thread moves them into a
+    bounded queue, so workers start on the first jobs while later ones are
+    still being discovered.
+
+    With a RecyclePolicy, healthy drivers are also replaced once they have
+    run too many jobs or grown too large. With warm=True every worker starts
+    its browser straight away instead of on its first job, and starts a new
+    one as soon as its browser is recycled. renew() replaces every browser
+    before its next job, e.g. once the saved login has been renewed.
+
+    With hand_off, each result is passed to hand_off(result) instead of being
+    collected, once the job's watchdog has stopped; it may block (e.g. on a
+    full queue) without the browser being taken for hung.
+    """
+
+    def __init__(self, create_driver, process_job, workers=2, job_timeout=600, max_attempts=2, recycle=None,
+                 warm=False, hand_off=None):
+        self.create_driver = create_driver
+        self.process_job = process_job
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+        self.recycle = recycle
+        self.warm = warm
+        self.hand_off = hand_off
+        self.urls = queue.Queue(maxsize=workers * 2)
+        self.retries = queue.Queue()
+        self.results = []
+        self._results_lock = threading.Lock()
+        self._feeding_done = threading.Event()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._generation = 0
+
+    def run(self, urls, on_failure=None):
+        """Process every URL and return the list of results from successful jobs."""
+        feeder = threading.Thread(target=self._feed, args=(urls,), name="browser-feeder", daemon=True)
+        feeder.start()
+
+        threads = [
+            threading.Thread(target=self._worker, args=(index, on_failure), name=f"browser-{index}")
+            for index in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.results
+
+    def renew(self):
+        """Have every worker replace its browser before the next job it takes."""
+        self._generation += 1
+
+    def _feed(self, urls):
+        try:
+            for url in urls:
+                self.urls.put((url, 1))
+        except Exception as e:
+            print(f"⚠️ Stopped reading job URLs: {e}")
+        finally:
+            self._feeding_done.set()
+
+    def _next_url(self):
+        """Take a retry first, then fresh work; returns None once there is nothing left."""
+        while True:
+            for source, wait in ((self.retries, None), (self.urls, 0.5)):
+                try:
+                    item = source.get(timeout=wait) if wait else source.get_nowait()
+                except queue.Empty:
+                    continue
+                with self._in_flight_lock:
+                    self._in_flight += 1
+                return item
+            with self._in_flight_lock:
+                if (self._feeding_done.is_set() and self._in_flight == 0
+                        and self.urls.empty() and self.retries.empty()):
+                    return None
+
+    def _worker(self, index, on_failure):
+        generation = self._generation
+        driver = self._warm_driver(index)
+        while True:
+            item = self._next_url()
+            if item is None:
+                break
+            try:
+                if generation != self._generation:
+                    generation = self._generation
+                    if driver is not None:
+                        self._quit(driver)
+                        driver = None
+                driver = self._process(index, driver, *item, on_failure)
+                if driver is None:
+                    driver = self._warm_driver(index)
+            finally:
+                with self._in_flight_lock:
+                    self._in_flight -= 1
+
+        if driver is not None:
+            self._quit(driver)
+
+    def _warm_driver(self, index):
+        """A new browser for the worker when warm=True, else None (it starts on the next job)."""
+        if not self.warm:
+            return None
+        try:
+            return self.create_driver()
+        except Exception as e:
+            print(f"⚠️ [browser-{index}] Could not start browser: {e}")
+            return None
+
+    def _process(self, index, driver, url, attempt, on_failure):
+        """Run one job; returns the driver to use next (None if it had to be quit)."""
+        if driver is None:
+            try:
+                driver = self.create_driver()
+            except Exception as e:
+                print(f"⚠️ [browser-{index}] Could not start browser: {e}")
+                self._fail(url, e, on_failure)
+                return None
+
+        hung = threading.Event()
+        watchdog = threading.Timer(self.job_timeout, self._kill_hung_driver, args=(driver, hung))
+        watchdog.daemon = True
+        watchdog.start()
+        done = False
+        try:
+            result = self.process_job(driver, url)
+            done = True
+        except Exception as e:
+            if hung.is_set() or browser_died(e):
+                print(f"🔄 [browser-{index}] Browser crashed or hung on {url}; recycling it")
+                self._quit(driver)
+                driver = None
+                if attempt < self.max_attempts:
+                    self.retries.put((url, attempt + 1))
+                    return None
+            self._fail(url, e, on_failure)
+        finally:
+            watchdog.cancel()
+        if done and hung.is_set():
+            # The job finished just as the watchdog fired; the driver has been quit
+            self._quit(driver)
+            driver = None
+        if done:
+            if self.hand_off is not None:
+                self.hand_off(result)
+            else:
+                with self._results_lock:
+                    self.results.append(result)
+        if driver is not None and self.recycle is not None and self.recycle.due(driver):
+            self._quit(driver)
+            driver = None
+        return driver
+
+    def _kill_hung_driver(self, driver, hung):
+        # Quitting the driver makes the blocked WebDriver call in the worker raise.
+        hung.set()
+        self._quit(driver)
+
+    def _fail(self, url, error, on_failure):
+        print(f"Error processing job: {error}")
+        if on_failure:
+            on_failure(url, error)
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -0,0 +1,87 @@
+from selenium import webdriver
+
+from utils.xhr_capture import enable_performance_log
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Chrome switches that turn off background work a scraping session never needs
+LEAN_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false",
+    "--window-size=1366,900",
+]
+
+
+def browser_options(headless=True, lean=True, performance_log=False):
+    """
+    ChromeOptions for a scraping browser: headless, and without images or
+    background services if lean. performance_log records network events for XhrCapture.
+    """
+    options = webdriver.ChromeOptions()
+    if performance_log:
+        enable_performance_log(options)
+    if headless:
+        options.add_argument("--headless=new")
+    if lean:
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+def block_urls(driver, patterns):
+    """Have Chrome drop requests matching any of the wildcard patterns before they are sent."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+
+def browser_rss_mb(driver):
+    """Resident memory of chromedriver and every Chrome process under it, or None without psutil."""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass  # Renderer exited while we were counting
+    return round(total / 1024 / 1024, 1)
+
+
+class RecyclePolicy:
+    """
+    Decides when a long-lived browser should be restarted to hand its memory
+    back: after max_jobs jobs, or once its processes pass max_rss_mb (only
+    checked when psutil is installed). Either limit can be None to disable it.
+    """
+
+    def __init__(self, max_jobs=50, max_rss_mb=None):
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+
+    def due(self, driver):
+        """Count a finished job on driver; True if it should now be quit and replaced."""
+        driver.jobs_done = getattr(driver, "jobs_done", 0) + 1
+        if self.max_jobs and driver.jobs_done >= self.max_jobs:
+            print(f"♻️ Recycling browser after {driver.jobs_done} jobs")
+            return True
+        if self.max_rss_mb:
+            rss = browser_rss_mb(driver)
+            if rss is not None and rss > self.max_rss_mb:
+                print(f"♻️ Recycling browser using {rss:.0f} MB after {driver.jobs_done} jobs")
+                return True
+        return False
@@ -0,0 +1,212 @@
+# utils/company_resolver.py
+# Client name -> Zoho CRM parent account, cached in SQLite so each client is
+# looked up in Zoho once per COMPANY_CACHE_TTL_DAYS instead of once per job.
+# Warm the cache for a batch of clients ahead of a run:
+#
+#   python -m utils.company_resolver "Acme Plumbing" "Smith & Sons"
+#   python -m utils.company_resolver --from-index
+import argparse
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from pages.zoho_crm import ZohoCRM
+from pages.zoho_login_page import ZohoLoginPage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    key TEXT PRIMARY KEY,
+    client_name TEXT NOT NULL,
+    parent_company TEXT,
+    resolved_at REAL NOT NULL
+);
+"""
+
+
+def normalize_client(name):
+    """Cache key for a client name: case, punctuation and spacing don't matter."""
+    name = re.sub(r"[^\w\s&]", " ", (name or "").casefold())
+    return " ".join(name.split())
+
+
+class CompanyLookupFailed(Exception):
+    """Zoho couldn't be asked about a client, so the folder its jobs belong in isn't known."""
+
+
+class CompanyResolver:
+    """
+    Looks up each client's parent account in Zoho CRM, remembering the answer
+    (including "no parent") for ttl seconds. Cached clients are answered from
+    memory; Zoho is only opened, in one browser logged in on first use, for
+    clients that aren't cached yet. Safe to call from the download threads:
+    a Zoho lookup doesn't hold up cache hits, and threads asking about the
+    same client at once share one lookup.
+    """
+
+    def __init__(self, path="company_cache.db", ttl=30 * 24 * 3600, create_driver=None):
+        self.path = path
+        self.ttl = ttl
+        self.create_driver = create_driver
+        self.hits = 0
+        self.lookups = 0
+        self._driver = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        # _lock guards the cache and the database; _zoho_lock the one Zoho browser
+        self._lock = threading.Lock()
+        self._zoho_lock = threading.Lock()
+        self._pending = {}
+        # Only entries still inside the TTL are loaded, so an expired one reads as a miss
+        cutoff = time.time() - ttl
+        self._cache = {
+            key: parent
+            for key, parent in self._conn.execute(
+                "SELECT key, parent_company FROM companies WHERE resolved_at >= ?", (cutoff,)
+            )
+        }
+
+    def parent_company(self, client_name):
+        """
+        The client's parent account name, or None if it has none (or no client
+        name was given). Raises CompanyLookupFailed if Zoho couldn't be asked;
+        nothing is cached then, so a retry of the job looks it up again.
+        """
+        key = normalize_client(client_name)
+        if not key:
+            return None
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                return self._cache[key] or None
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if owner:
+            self._resolve(key, client_name, future)
+        return future.result() or None
+
+    def prefetch(self, client_names):
+        """
+        Resolve every client in a batch that isn't cached yet, in one Zoho
+        session. Names are de-duplicated after normalising; a failed lookup
+        is left for the job that needs it to retry.
+        """
+        missing = {}
+        with self._lock:
+            for name in client_names:
+                key = normalize_client(name)
+                if key and key not in self._cache:
+                    missing.setdefault(key, name)
+        if not missing:
+            return 0
+        print(f"🏢 Looking up {len(missing)} client(s) in Zoho CRM")
+        for name in missing.values():
+            try:
+                self.parent_company(name)
+            except CompanyLookupFailed:
+                pass
+        return len(missing)
+
+    def _resolve(self, key, client_name, future):
+        try:
+            with self._zoho_lock:
+                parent = self._lookup(client_name)
+        except Exception as e:
+            print(f"⚠️ Zoho lookup failed for {client_name}: {e}")
+            with self._lock:
+                self.lookups += 1
+                del self._pending[key]
+            future.set_exception(CompanyLookupFailed(f"Zoho lookup failed for {client_name}: {e}"))
+            return
+        with self._lock:
+            self.lookups += 1
+            self._cache[key] = parent or ""
+            self._conn.execute(
+                "INSERT OR REPLACE INTO companies (key, client_name, parent_company, resolved_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, client_name, parent or "", time.time()),
+            )
+            self._conn.commit()
+            del self._pending[key]
+        future.set_result(parent or "")
+        print(f"🏢 {client_name} -> {parent or 'no parent account'}")
+
+    def _lookup(self, client_name):
+        import config_zoho
+
+        if self._driver is None:
+            self._driver = self.create_driver()
+            login_to_zoho(self._driver)
+        self._driver.get(config_zoho.ZOHO_ACCOUNTS_URL)
+        crm = ZohoCRM(self._driver)
+        crm.search_company(client_name)
+        return crm.get_parent_company()
+
+    def close(self):
+        with self._zoho_lock, self._lock:
+            if self._driver is not None:
+                self._driver.quit()
+                self._driver = None
+            self._conn.close()
+        if self.hits or self.lookups:
+            print(f"🏢 Parent companies: {self.hits} cached, {self.lookups} looked up in Zoho")
+
+
+def login_to_zoho(driver):
+    import config_zoho
+
+    driver.get(config_zoho.ZOHO_LOGIN_URL)
+    login_page = ZohoLoginPage(driver)
+    login_page.enter_username(config_zoho.ZOHO_USERNAME)
+    login_page.click_login()
+    login_page.enter_password(config_zoho.ZOHO_PASSWORD)
+    login_page.click_login()
+    WebDriverWait(driver, config_zoho.ZOHO_SEARCH_TIMEOUT * 3).until(lambda d: "crm.zoho" in d.current_url)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fill the Zoho parent-company cache for a batch of clients.")
+    parser.add_argument("clients", nargs="*", help="client names to resolve")
+    parser.add_argument("--from-index", action="store_true",
+                        help="resolve every client in the attachment index")
+    return parser.parse_args()
+
+
+def main():
+    import config_zoho
+    import scraper
+
+    args = parse_args()
+    names = list(args.clients)
+    if args.from_index:
+        from utils.attachment_index import AttachmentIndex
+
+        index = AttachmentIndex(scraper.config_geoop.ATTACHMENT_INDEX_FILE)
+        names += index.clients()
+        index.close()
+    resolver = CompanyResolver(
+        config_zoho.COMPANY_CACHE_FILE,
+        ttl=config_zoho.COMPANY_CACHE_TTL_DAYS * 24 * 3600,
+        create_driver=scraper.create_driver,
+    )
+    try:
+        resolver.prefetch(names)
+        for name in names:
+            try:
+                print(f"{name}\t{resolver.parent_company(name) or ''}")
+            except CompanyLookupFailed:
+                continue
+    finally:
+        resolver.close()
+
+
+if __name__ == "__main__":
+    main()
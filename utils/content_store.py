@@ -0,0 +1,118 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+# Linux ioctl that makes dst share src's extents (btrfs, XFS); see ioctl_ficlone(2).
+FICLONE = 0x40049409
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url_key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def url_key(url):
+    """Drop the signed query string so re-signed links to the same file share a key."""
+    return url.split('?')[0].split('&')[0]
+
+
+def reflink(src, dst):
+    """Clone src to dst without copying data; raises OSError where unsupported."""
+    import fcntl
+    with open(src, "rb") as source, open(dst, "wb") as target:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+
+class ContentStore:
+    """
+    Keeps one copy of each attachment, named by its SHA-256, and materialises
+    the output tree paths as hardlinks (or reflinks) to it. A SQLite index
+    maps digests and normalised URLs to blobs, so a file already in the
+    archive is recognised with a single lookup, whichever job it came from.
+    """
+
+    def __init__(self, root="output/.store", link_mode="hardlink"):
+        self.root = root
+        self.link_mode = link_mode
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def has(self, digest):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        return row is not None and os.path.exists(self.blob_path(digest))
+
+    def digest_for_url(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM urls WHERE url_key = ?", (url_key(url),)).fetchone()
+        return row[0] if row else None
+
+    def materialise_url(self, url, path):
+        """Link path to the blob already stored for url. Returns False if url is unknown."""
+        digest = self.digest_for_url(url)
+        if digest is None or not self.has(digest):
+            return False
+        self.materialise(digest, path)
+        return True
+
+    def add_file(self, tmp_path, digest, url):
+        """
+        Move a freshly downloaded file into the store under its digest, or
+        discard it if that content is already stored.
+        """
+        blob = self.blob_path(digest)
+        if self.has(digest):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, blob)
+            os.chmod(blob, 0o444)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (digest, size, added_at) VALUES (?, ?, ?)",
+                    (digest, size, time.time()),
+                )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url_key, digest) VALUES (?, ?)", (url_key(url), digest)
+            )
+            self._conn.commit()
+
+    def materialise(self, digest, path):
+        """Create path as a link to the blob, replacing whatever was there."""
+        blob = self.blob_path(digest)
+        tmp_path = f"{path}.link-tmp"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            if self.link_mode == "reflink":
+                reflink(blob, tmp_path)
+            elif self.link_mode == "hardlink":
+                os.link(blob, tmp_path)
+            else:
+                shutil.copyfile(blob, tmp_path)
+        except OSError:
+            # Different filesystem or no reflink support: fall back to a plain copy
+            shutil.copyfile(blob, tmp_path)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
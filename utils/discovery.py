@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+from pages.job_list_page import JobListPage
+
+
+def load_checkpoint(filename):
+    """Return the last job list page a crawl reached, or 1 to start from the beginning."""
+    if not os.path.exists(filename):
+        return 1
+    with open(filename, "r") as f:
+        return json.load(f).get("page", 1)
+
+
+def save_checkpoint(filename, page):
+    tmp_path = f"{filename}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"page": page, "updated_at": time.time()}, f)
+    os.replace(tmp_path, filename)
+
+
+def clear_checkpoint(filename):
+    if os.path.exists(filename):
+        os.remove(filename)
+
+
+def discover_job_urls(driver, jobs_url, checkpoint_file, ledger, skip=None):
+    """
+    Crawl the job list page by page and yield job URLs as they are found, so
+    processing can start before the crawl finishes. The checkpoint only moves
+    past a page once every job handed out from it has been finished or failed
+    in the ledger, so an interrupted run resumes from the first page with
+    unrecorded jobs; it is removed when the crawl completes. URLs for which
+    skip(url) is true are left out.
+    """
+    start_page = load_checkpoint(checkpoint_file)
+    if start_page > 1:
+        print(f"🔄 Resuming job discovery from page {start_page}")
+
+    started = time.time()
+    driver.get(jobs_url)
+    seen = set()
+    waiting = []  # (page, URLs handed out from it) not yet all in the ledger, oldest first
+    for page, job_urls in JobListPage(driver).iter_job_urls(start_page):
+        print(f"🔎 Page {page}: found {len(job_urls)} jobs")
+        handed_out = set()
+        for url in job_urls:
+            if url in seen or (skip and skip(url)):
+                continue
+            seen.add(url)
+            handed_out.add(url)
+            yield url
+        waiting.append((page, handed_out))
+        waiting = advance_checkpoint(checkpoint_file, ledger, waiting, started)
+    clear_checkpoint(checkpoint_file)
+    print("✅ Job discovery finished")
+
+
+def advance_checkpoint(checkpoint_file, ledger, waiting, since):
+    """Checkpoint past the leading pages whose jobs are all recorded; returns the pages still waiting."""
+    pending = set().union(*(urls for _, urls in waiting))
+    pending -= ledger.settled_since(pending, since)
+    recorded = None
+    while waiting and not waiting[0][1] & pending:
+        recorded = waiting.pop(0)[0]
+    if recorded is not None:
+        # The checkpoint must never get ahead of what the ledger has on disk
+        ledger.flush()
+        save_checkpoint(checkpoint_file, recorded + 1)
+    return waiting
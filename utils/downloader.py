@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.file_manager import link_or_copy
+from utils.rate_limiter import RateLimiter, is_retryable
+
+CHUNK_SIZE = 64 * 1024
+
+# An S3-style ETag for a single-part upload is the MD5 of the body
+MD5_ETAG = re.compile(r'^"?([0-9a-f]{32})"?$')
+
+
+class IncompleteDownload(IOError):
+    """The body ended before the expected length or did not match its ETag."""
+
+
+class ByteBudget:
+    """Caps the number of bytes being transferred at once across all downloads."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size):
+        # A single file bigger than the whole budget still gets to run, just alone.
+        size = min(size, self.limit)
+        with self._cond:
+            while self.in_flight and self.in_flight + size > self.limit:
+                self._cond.wait()
+            self.in_flight += size
+        return size
+
+    def release(self, size):
+        with self._cond:
+            self.in_flight -= size
+            self._cond.notify_all()
+
+
+class Downloader:
+    """
+    Fetches attachments over one pooled session, streaming each body to disk.
+    With a ContentStore, bodies are hashed as they stream in and saved once
+    per digest, and known URLs are linked from the store without a request.
+
+    Bodies are written to "<path>.part" and only renamed into place once their
+    length checks out, and on md5_etag_hosts (hosts whose ETag is known to be
+    the body's MD5, e.g. S3) their MD5 too; elsewhere a mismatching ETag that
+    merely looks like an MD5 is only logged. A retry, or
+    a later run, resumes a .part file with a Range request on hosts that
+    support it; whether a host does is remembered in self.range_support.
+
+    Every request goes through self.limiter, which is shared with page loads
+    so the whole scraper backs off together when GeoOp starts throttling.
+
+    With a ValidatorCache, a URL saved before is fetched with If-None-Match /
+    If-Modified-Since, and a 304 reuses the earlier copy. When the server gave
+    no validators, a HEAD reporting the same size counts as unchanged.
+    """
+
+    def __init__(self, max_workers=4, max_inflight_bytes=64 * 1024 * 1024,
+                 timeout=30, max_retries=3, chunk_size=CHUNK_SIZE, store=None, limiter=None, validators=None,
+                 md5_etag_hosts=()):
+        self.max_workers = max_workers
+        self.md5_etag_hosts = set(md5_etag_hosts)
+        self.store = store
+        self.validators = validators
+        self.limiter = limiter or RateLimiter(max_concurrency=max_workers)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.chunk_size = chunk_size
+        self.budget = ByteBudget(max_inflight_bytes)
+        self.range_support = {}
+        self._range_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def download(self, url, path):
+        """Download a single URL to path with retries. Returns True on success."""
+        return self._download(url, path)[0] is None
+
+    def download_all(self, tasks, max_workers=None, on_result=None, metrics=None):
+        """
+        Download a list of (url, path) tuples in a bounded thread pool.
+        on_result(url, path, error) is called from the worker thread as each
+        one finishes, with error None on success. With a JobMetrics, each
+        download's size, retries and duration are recorded on it too.
+        Returns a list of booleans in the same order as tasks.
+        """
+        if not tasks:
+            return []
+
+        def run(task):
+            url, path = task
+            start = time.monotonic()
+            error, size, attempts = self._download(url, path)
+            if on_result:
+                on_result(url, path, error)
+            if metrics is not None:
+                metrics.record_download(url, path, error, size, attempts, time.monotonic() - start)
+            return error is None
+
+        workers = min(max_workers or self.max_workers, len(tasks))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, tasks))
+
+    def _download(self, url, path):
+        """
+        Download with retries. Returns (error, bytes_transferred, attempts),
+        with error None on success. Permanent errors such as a 404 are not retried.
+        """
+        transferred = 0
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                transferred += self._fetch(url, path)
+                return None, transferred, attempt
+            except (requests.RequestException, IOError) as e:
+                retryable = isinstance(e, IncompleteDownload) or is_retryable(e)
+                if not retryable or attempt == self.max_retries:
+                    print(f"Failed to download image after {attempt} attempt(s): {e}")
+                    return e, transferred, attempt
+                time.sleep(self.limiter.backoff(attempt, e))
+
+    def _fetch(self, url, path):
+        """Fetch url into path; returns the number of body bytes received."""
+        if self.store is not None and self.store.materialise_url(url, path):
+            return 0
+        cached = self.validators.get(url) if self.validators is not None else None
+        if cached is not None and not self._has_copy(cached):
+            cached = None
+        part_path = f"{path}.part"
+        offset, meta = self._resume_point(url, part_path)
+
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if meta.get("etag"):
+                headers["If-Range"] = meta["etag"]
+        elif cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+            if not headers and self._same_size_by_head(url, cached):
+                self._reuse(url, cached, path)
+                return 0
+
+        with self.limiter.slot(url, paced=False) as ticket, \
+                self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as response:
+            ticket.responded()
+            if response.status_code == 304:
+                self._reuse(url, cached, path)
+                return 0
+            if response.status_code == 416:
+                # The partial file no longer fits the remote one; start over next attempt
+                self._discard_part(part_path)
+                raise IncompleteDownload(f"Range not satisfiable for {url}; restarting")
+            response.raise_for_status()
+            self._note_range_support(url, response)
+
+            if response.status_code == 206:
+                total = content_range_total(response)
+            else:
+                # Full body: the server ignored the Range or the file changed
+                offset = 0
+                length = response.headers.get("Content-Length")
+                total = int(length) if length else None
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            with open(f"{part_path}.json", "w") as f:
+                json.dump({"etag": etag, "total": total}, f)
+
+            remaining = total - offset if total else self.chunk_size
+            reserved = self.budget.acquire(max(remaining, 1))
+            try:
+                sha256, md5 = self._stream_to_part(response, part_path, offset)
+            finally:
+                self.budget.release(reserved)
+
+            self._verify(url, response, part_path, total, etag, md5)
+        size = os.path.getsize(part_path)
+        self._place(url, part_path, path, sha256.hexdigest())
+        os.remove(f"{part_path}.json")
+        if self.validators is not None:
+            self.validators.put(url, path, size, etag, last_modified)
+        return size - offset
+
+    @staticmethod
+    def _has_copy(cached):
+        """Whether the copy saved last time is still on disk, unchanged in size."""
+        return os.path.exists(cached["path"]) and os.path.getsize(cached["path"]) == cached["size"]
+
+    def _same_size_by_head(self, url, cached):
+        """Fallback for servers without validators: a HEAD reporting the size saved last time."""
+        with self.limiter.slot(url, paced=False) as ticket:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            ticket.responded()
+        length = response.headers.get("Content-Length")
+        return response.ok and length is not None and int(length) == cached["size"]
+
+    def _reuse(self, url, cached, path):
+        """The remote file hasn't changed: put the earlier copy at path instead of downloading it."""
+        if cached["path"] != path:
+            link_or_copy(cached["path"], path)
+        self.validators.put(url, path, cached["size"], cached["etag"], cached["last_modified"])
+
+    def _resume_point(self, url, part_path):
+        """Return how many bytes of the .part file can be kept, and its saved metadata."""
+        if not os.path.exists(part_path):
+            return 0, {}
+        if self.range_support.get(urlsplit(url).netloc) is False:
+            self._discard_part(part_path)
+            return 0, {}
+        try:
+            with open(f"{part_path}.json", "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        return os.path.getsize(part_path), meta
+
+    def _note_range_support(self, url, response):
+        host = urlsplit(url).netloc
+        supported = response.status_code == 206 or response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        with self._range_lock:
+            if supported or host not in self.range_support:
+                self.range_support[host] = supported
+
+    def _stream_to_part(self, response, part_path, offset):
+        """
+        Write the body to the .part file, appending after offset bytes, and
+        return SHA-256 and MD5 hashers covering the whole file.
+        """
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        mode = "r+b" if offset else "wb"
+        with open(part_path, mode) as f:
+            if offset:
+                # Hash the bytes kept from the earlier attempt before appending
+                while f.tell() < offset:
+                    chunk = f.read(min(self.chunk_size, offset - f.tell()))
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    md5.update(chunk)
+                f.truncate(offset)
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if chunk:
+                    sha256.update(chunk)
+                    md5.update(chunk)
+                    f.write(chunk)
+        return sha256, md5
+
+    def _verify(self, url, response, part_path, total, etag, md5):
+        if response.headers.get("Content-Encoding"):
+            # The stored bytes are decoded, so they won't match the wire length
+            return
+        size = os.path.getsize(part_path)
+        if total is not None and size != total:
+            raise IncompleteDownload(f"Got {size} of {total} bytes")
+        match = MD5_ETAG.match(etag or "")
+        if match and md5.hexdigest() != match.group(1):
+            if urlsplit(url).hostname not in self.md5_etag_hosts:
+                # Plenty of servers use 32 hex digits for ETags that aren't the body's MD5
+                print(f"⚠️ {url}: ETag {etag} is not the body's MD5; keeping the file")
+                return
+            self._discard_part(part_path)
+            raise IncompleteDownload("Downloaded file does not match its ETag")
+
+    @staticmethod
+    def _discard_part(part_path):
+        for leftover in (part_path, f"{part_path}.json"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    def _place(self, url, tmp_path, path, digest):
+        """Rename the finished file into place, or hand it to the content store."""
+        if self.store is None:
+            os.replace(tmp_path, path)
+            return
+        self.store.add_file(tmp_path, digest, url)
+        self.store.materialise(digest, path)
+
+    def close(self):
+        self.session.close()
+        if self.store is not None:
+            self.store.close()
+        if self.validators is not None:
+            self.validators.close()
+
+
+def content_range_total(response):
+    """Return the full size from a 'Content-Range: bytes 100-199/200' header, if given."""
+    match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
@@ -1,4 +1,10 @@
+import hashlib
 import os
+import shutil
+
+def create_photo_folders(job_folder):
+    os.makedirs(os.path.join(job_folder, "Before_Photos"), exist_ok=True)
+    os.makedirs(os.path.join(job_folder, "After_Photos"), exist_ok=True)
 
 def create_directory_structure(client_name, job_title):
     base_folder = "output"
@@ -6,7 +12,21 @@ def create_directory_structure(client_name, job_title):
     job_folder = os.path.join(client_folder, job_title.replace(" ", "_"))
     
     os.makedirs(job_folder, exist_ok=True)
-    os.makedirs(os.path.join(job_folder, "Before_Photos"), exist_ok=True)
-    os.makedirs(os.path.join(job_folder, "After_Photos"), exist_ok=True)
+    create_photo_folders(job_folder)
 
     return job_folder
+
+def link_or_copy(src, dst):
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,79 @@
+# utils/high_water.py
+# Per-job high-water marks for incremental runs: the newest note already
+# saved (its date/time and the identities of the rows at that time), the
+# identities of saved rows whose date can't be read, and the next file
+# number, kept in the run ledger. A refresh only saves the rows the mark
+# doesn't cover.
+import hashlib
+
+from utils.attachment_index import parse_note_datetime
+from utils.content_store import url_key
+
+
+def row_key(row):
+    """Identity of a note row: its attachment URL without the signature, else a hash of its date and text."""
+    if row.get("url"):
+        return url_key(row["url"])
+    text = f"{row.get('date')}\n{row.get('note')}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _row_time(row):
+    parsed = parse_note_datetime(row.get("date"))
+    return parsed.isoformat() if parsed else None
+
+
+def is_new(row, mark):
+    """
+    Whether a row is newer than the mark. A row whose date can't be read is
+    new unless the mark lists its identity as already saved.
+    """
+    row_time = _row_time(row)
+    if row_time is None:
+        return row_key(row) not in mark.get("undated_keys", ())
+    return row_time > mark["note_date"] or (row_time == mark["note_date"] and row_key(row) not in mark["row_keys"])
+
+
+def new_rows(rows, mark):
+    """The rows not covered by the mark, in their original order; all of them without a mark."""
+    if mark is None:
+        return list(rows)
+    return [row for row in rows if is_new(row, mark)]
+
+
+def reached(rows, mark):
+    """
+    Whether the rows loaded so far already go back to the mark, so the ones
+    further down needn't be scrolled in. That holds only for a table listed
+    newest first whose last loaded row is covered by the mark; listed oldest
+    first, the new rows are at the bottom and the table is loaded in full.
+    """
+    if mark is None or not rows:
+        return False
+    times = [row_time for row_time in map(_row_time, rows) if row_time is not None]
+    if len(times) < 2 or times[0] <= times[-1]:
+        return False
+    return not is_new(rows[-1], mark)
+
+
+def advance(mark, rows, next_index):
+    """The mark after saving rows: the newest note time seen, the rows at that time and the undated rows."""
+    note_date = mark["note_date"] if mark else ""
+    row_keys = set(mark["row_keys"]) if mark else set()
+    undated_keys = set(mark.get("undated_keys", ())) if mark else set()
+    for row in rows:
+        row_time = _row_time(row)
+        if row_time is None:
+            undated_keys.add(row_key(row))
+        elif row_time > note_date:
+            note_date, row_keys = row_time, {row_key(row)}
+        elif row_time == note_date:
+            row_keys.add(row_key(row))
+    if not note_date and not undated_keys:
+        return mark
+    return {
+        "note_date": note_date,
+        "row_keys": sorted(row_keys),
+        "undated_keys": sorted(undated_keys),
+        "next_index": next_index,
+    }
@@ -0,0 +1,63 @@
+import json
+import os
+
+import requests
+
+from pages.job_html import parse_job_html
+from utils.rate_limiter import RETRYABLE_STATUS
+
+
+class SessionExpired(Exception):
+    """The saved GeoOp session is no longer accepted and the browser must log in again."""
+
+
+def session_from_cookies(cookies):
+    """Build a requests session carrying a list of Selenium-style cookie dicts."""
+    session = requests.Session()
+    for cookie in cookies:
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain"),
+            path=cookie.get("path", "/"),
+        )
+    return session
+
+
+def load_session(filename="cookies.json"):
+    """Build a requests session carrying the cookies saved by the browser login."""
+    cookies = []
+    if os.path.exists(filename):
+        with open(filename, "r") as f:
+            cookies = json.load(f)
+    return session_from_cookies(cookies)
+
+
+def is_login_page(response):
+    """GeoOp answers an expired session by redirecting to the login form."""
+    if response.status_code in (401, 403):
+        return True
+    return 'id="loginname"' in response.text and 'id="noteTable"' not in response.text
+
+
+def fetch_job(session, job_url, timeout=30, limiter=None):
+    """
+    Fetch a job page over plain HTTP and parse it into the same job dict the
+    browser extraction produces. Raises SessionExpired when GeoOp asks to log in
+    and MissingNoteTable when the page has no note table to read.
+    With a RateLimiter, the request waits its turn and throttled or failed
+    requests are retried with backoff.
+    """
+    def get():
+        response = session.get(job_url, timeout=timeout)
+        if response.status_code in RETRYABLE_STATUS:
+            response.raise_for_status()
+        return response
+
+    response = limiter.call(job_url, get) if limiter else get()
+    if is_login_page(response):
+        raise SessionExpired(f"Redirected to login while fetching {job_url}")
+    response.raise_for_status()
+    job = parse_job_html(response.text)
+    job["url"] = job_url
+    return job
@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from utils.chrome_profile import browser_rss_mb
+
+
+def instrument_driver(driver):
+    """Count every WebDriver command the driver sends in driver.command_count."""
+    driver.command_count = 0
+    execute = driver.execute
+
+    def counting_execute(driver_command, params=None):
+        driver.command_count += 1
+        return execute(driver_command, params)
+
+    driver.execute = counting_execute
+    return driver
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+class JobMetrics:
+    """Timings, WebDriver command count and download stats for one job."""
+
+    def __init__(self, job_url, driver=None):
+        self.job_url = job_url
+        self.phases = {}
+        self.downloads = []
+        self._driver = driver
+        self._commands_at_start = getattr(driver, "command_count", 0)
+        self._commands = 0
+        self._rss = None
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(self.phases.get(name, 0) + time.monotonic() - start, 4)
+
+    def record_download(self, url, path, error, size, attempts, seconds):
+        # Called from the downloader's worker threads
+        with self._lock:
+            self.downloads.append({
+                "url": url,
+                "path": path,
+                "ok": error is None,
+                "error": str(error) if error else None,
+                "bytes": size,
+                "retries": max(attempts - 1, 0),
+                "seconds": round(seconds, 4),
+            })
+
+    @property
+    def webdriver_commands(self):
+        if self._driver is None:
+            return self._commands
+        return getattr(self._driver, "command_count", 0) - self._commands_at_start
+
+    def browser_done(self):
+        """Freeze the browser's numbers before it moves on to another job while this one downloads."""
+        if self._driver is not None:
+            self._commands = self.webdriver_commands
+            self._rss = browser_rss_mb(self._driver)
+            self._driver = None
+
+    def to_record(self, error=None):
+        rss = browser_rss_mb(self._driver) if self._driver is not None else self._rss
+        return {
+            "event": "job",
+            "url": self.job_url,
+            "ok": error is None,
+            "error": str(error) if error else None,
+            "seconds": round(time.monotonic() - self._start, 4),
+            "phases": self.phases,
+            "webdriver_commands": self.webdriver_commands,
+            "browser_rss_mb": rss,
+            "downloads": len(self.downloads),
+            "failed_downloads": sum(1 for d in self.downloads if not d["ok"]),
+            "bytes": sum(d["bytes"] for d in self.downloads),
+            "retries": sum(d["retries"] for d in self.downloads),
+        }
+
+
+class MetricsRecorder:
+    """
+    Appends one JSON line per job (plus one per download and per run-level
+    phase such as login) to a metrics file, and keeps enough in memory to
+    print a percentile summary at the end of the run.
+
+    If profile_url is set, profiled(profile_url) runs that one job under a
+    profiler: pyinstrument (sampling) when installed, otherwise cProfile.
+    """
+
+    def __init__(self, path="metrics.jsonl", profile_url=None):
+        self.path = path
+        self.profile_url = profile_url
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+        self._job_seconds = []
+        self._phase_seconds = defaultdict(list)
+        self._commands = []
+        self._bytes = 0
+        self._retries = 0
+        self._failed = 0
+        self._peak_rss = None
+
+    def job(self, job_url, driver=None):
+        return JobMetrics(job_url, driver)
+
+    def finish(self, job_metrics, error=None):
+        record = job_metrics.to_record(error)
+        with self._lock:
+            for download in job_metrics.downloads:
+                self._write(dict(download, event="download", job_url=job_metrics.job_url))
+            self._write(record)
+            self._job_seconds.append(record["seconds"])
+            for name, seconds in record["phases"].items():
+                self._phase_seconds[name].append(seconds)
+            self._commands.append(record["webdriver_commands"])
+            self._bytes += record["bytes"]
+            self._retries += record["retries"]
+            self._failed += 0 if record["ok"] else 1
+            if record["browser_rss_mb"] is not None:
+                self._peak_rss = max(self._peak_rss or 0, record["browser_rss_mb"])
+
+    @contextmanager
+    def phase(self, name):
+        """Time a run-level step that isn't part of any job, e.g. login."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            seconds = time.monotonic() - start
+            with self._lock:
+                self._write({"event": "phase", "phase": name, "seconds": round(seconds, 4)})
+                self._phase_seconds[name].append(seconds)
+
+    def profiled(self, job_url):
+        if not self.profile_url or job_url != self.profile_url:
+            return nullcontext()
+        return self._profile(job_url)
+
+    @contextmanager
+    def _profile(self, job_url):
+        name = job_url.rstrip("/").split("/")[-1]
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+
+        if Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                output = f"profile_{name}.html"
+                with open(output, "w") as f:
+                    f.write(profiler.output_html())
+                print(f"📈 Sampling profile for {job_url} saved to {output}")
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                output = f"profile_{name}.prof"
+                profiler.dump_stats(output)
+                print(f"📈 pyinstrument not installed; cProfile stats for {job_url} saved to {output}")
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def summary(self):
+        """Print per-phase percentiles and run totals."""
+        jobs = len(self._job_seconds)
+        if not jobs and not self._phase_seconds:
+            return
+        print(f"📊 {jobs} job(s), {self._failed} failed, {self._bytes / 1024 / 1024:.1f} MB downloaded, "
+              f"{self._retries} download retries")
+        if self._commands:
+            print(f"   WebDriver commands per job: p50 {percentile(self._commands, 50)}, "
+                  f"p95 {percentile(self._commands, 95)}")
+        if self._peak_rss is not None:
+            print(f"   Peak browser memory: {self._peak_rss:.0f} MB")
+        rows = [("job", self._job_seconds)] + sorted(self._phase_seconds.items())
+        print(f"   {'phase':<18}{'count':>7}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+        for name, values in rows:
+            if values:
+                print(f"   {name:<18}{len(values):>7}{percentile(values, 50):>9.2f}"
+                      f"{percentile(values, 95):>9.2f}{max(values):>9.2f}")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,55 @@
+import queue
+import threading
+
+
+class DownloadPipeline:
+    """
+    The second stage of a browser run. Jobs the browsers have finished reading
+    wait in a queue of at most depth entries for `workers` threads that
+    download and save them, so the browser moves on to the next job while
+    this one's files are still transferring. put() blocks once the queue is
+    full, which holds the browsers back when downloads fall behind.
+
+    process(item) does the work for one job and raises if it failed.
+    """
+
+    def __init__(self, process, depth=2, workers=1):
+        self.process = process
+        self.jobs = queue.Queue(maxsize=max(depth, 1))
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"download-stage-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item):
+        self.jobs.put(item)
+
+    def _run(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+            try:
+                self.process(item)
+                ok = True
+            except Exception:
+                # process() has already reported the failure
+                ok = False
+            with self._lock:
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def close(self):
+        """Wait for every queued job to finish downloading."""
+        for _ in self._threads:
+            self.jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        print(f"✅ {self.completed} job(s) completed, {self.failed} failed")
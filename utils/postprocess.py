@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_manager import create_photo_folders, file_sha256, link_or_copy
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+REENCODE_FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+
+# Used to recognise photos when Pillow isn't there to open them
+PHOTO_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".bmp", ".tif", ".tiff"}
+
+
+def exif_datetime(image):
+    """The capture time from EXIF as an ISO-style string, or None."""
+    exif = image.getexif()
+    value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    if not value:
+        return None
+    # EXIF writes "2024:03:12 10:04:59"
+    return str(value).strip().replace(":", "-", 2).replace(" ", "T", 1)
+
+
+def photo_category(text):
+    """Before_Photos or After_Photos if a file's description says so, else None."""
+    text = (text or "").lower()
+    if "before" in text:
+        return "Before_Photos"
+    if "after" in text:
+        return "After_Photos"
+    return None
+
+
+def process_file(path, description, job_folder, options):
+    """
+    Hash, measure and file one downloaded attachment. Runs in a worker process,
+    so it only takes and returns plain data. Image steps need Pillow and are
+    skipped for PDFs and anything else Pillow can't open.
+    """
+    name = os.path.basename(path)
+    entry = {
+        "path": path,
+        "description": description,
+        "size": os.path.getsize(path),
+        "sha256": file_sha256(path),
+        "width": None,
+        "height": None,
+        "taken_at": None,
+    }
+
+    if Image is not None:
+        try:
+            with Image.open(path) as image:
+                entry["width"], entry["height"] = image.size
+                entry["taken_at"] = exif_datetime(image)
+                if options["thumbnail_size"]:
+                    entry["thumbnail"] = save_thumbnail(image, name, job_folder, options["thumbnail_size"])
+                if options["reencode"]:
+                    entry.update(reencode(image, name, job_folder, options["reencode"], options["quality"]))
+        except (OSError, ValueError, SyntaxError):
+            pass  # Not an image Pillow can read
+
+    is_photo = entry["width"] is not None or os.path.splitext(name)[1].lower() in PHOTO_EXTENSIONS
+    category = photo_category(description or name) if is_photo else None
+    if category and options["sort_photos"]:
+        sorted_path = os.path.join(job_folder, category, name)
+        link_or_copy(path, sorted_path)
+        entry["category"] = category
+    return entry
+
+
+def save_thumbnail(image, name, job_folder, size):
+    folder = os.path.join(job_folder, "thumbnails")
+    os.makedirs(folder, exist_ok=True)
+    thumb = image.convert("RGB")
+    thumb.thumbnail((size, size))
+    thumb_path = os.path.join(folder, f"{os.path.splitext(name)[0]}.jpg")
+    thumb.save(thumb_path, "JPEG", quality=80)
+    return thumb_path
+
+
+def reencode(image, name, job_folder, fmt, quality):
+    """Save a smaller copy in fmt ("webp" or "avif") under <job>/<fmt>/; the original is kept."""
+    folder = os.path.join(job_folder, fmt)
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, f"{os.path.splitext(name)[0]}.{fmt}")
+    try:
+        image.save(target, REENCODE_FORMATS[fmt], quality=quality)
+    except (KeyError, OSError, ValueError) as e:
+        # e.g. a Pillow build without AVIF support
+        return {"reencode_error": str(e)}
+    return {"reencoded": target, "reencoded_size": os.path.getsize(target)}
+
+
+class PostProcessor:
+    """
+    Runs the CPU-bound work on finished jobs (checksums, image size and EXIF
+    capture time, thumbnails, Before/After sorting, optional WebP/AVIF copies)
+    in a process pool. submit_job() returns straight away; when all of a
+    job's files are done, manifest.json is written into the job folder.
+    """
+
+    def __init__(self, workers=None, thumbnail_size=320, reencode=None, quality=80, sort_photos=True):
+        self.options = {
+            "thumbnail_size": thumbnail_size,
+            "reencode": reencode,
+            "quality": quality,
+            "sort_photos": sort_photos,
+        }
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.manifests = 0
+        self._lock = threading.Lock()
+        if Image is None:
+            print("⚠️ Pillow is not installed; post-processing will only record checksums and sizes")
+
+    def job_saved(self, saved):
+        """Queue the attachments of a job save_job() has just finished."""
+        files = [(f["path"], f["description"]) for f in saved["files"] if f["url"]]
+        self.submit_job(saved["job_url"], saved["folder_path"], files)
+
+    def submit_job(self, job_url, job_folder, files):
+        """Queue a job's saved files, given as (path, description) pairs."""
+        if self.options["sort_photos"]:
+            create_photo_folders(job_folder)
+        job = {"url": job_url, "folder": job_folder, "pending": len(files), "files": []}
+        if not files:
+            self._write_manifest(job)
+            return
+        for path, description in files:
+            future = self.pool.submit(process_file, path, description, job_folder, self.options)
+            future.add_done_callback(lambda future, path=path: self._file_done(job, path, future))
+
+    def _file_done(self, job, path, future):
+        try:
+            entry = future.result()
+        except Exception as e:
+            entry = {"path": path, "error": str(e)}
+        with self._lock:
+            job["files"].append(entry)
+            job["pending"] -= 1
+            finished = job["pending"] == 0
+        if finished:
+            self._write_manifest(job)
+
+    def _write_manifest(self, job):
+        # An incremental run only hands over the new files; keep the entries of earlier runs
+        path = os.path.join(job["folder"], "manifest.json")
+        entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    entries = {entry["path"]: entry for entry in json.load(f).get("files", [])}
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read {path}; rewriting it: {e}")
+        entries.update((entry["path"], entry) for entry in job["files"])
+        manifest = {
+            "job_url": job["url"],
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": sorted(entries.values(), key=lambda entry: entry["path"]),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.manifests += 1
+
+    def close(self):
+        """Wait for the queued files to finish."""
+        self.pool.shutdown(wait=True)
+        print(f"🗂️ Post-processing finished; {self.manifests} job manifest(s) written")
@@ -0,0 +1,226 @@
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+# Statuses worth retrying; everything else in 4xx is a permanent answer
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Statuses meaning "slow down"
+THROTTLE_STATUS = {429, 503}
+
+# Malformed URLs will fail the same way every time
+PERMANENT_REQUEST_ERRORS = (
+    requests.exceptions.InvalidURL,
+    requests.exceptions.MissingSchema,
+    requests.exceptions.InvalidSchema,
+)
+
+
+def status_of(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(error):
+    """True for throttling, 5xx, timeouts and dropped connections; False for 404s and the like."""
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, PERMANENT_REQUEST_ERRORS):
+        return False
+    return isinstance(error, requests.RequestException)
+
+
+def retry_after(error):
+    """Seconds asked for by a Retry-After header (delta or HTTP date) on the error's response, if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Take a token, possibly on credit; returns how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostState:
+    def __init__(self, rate, burst, limit, window):
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = limit
+        self.active = 0
+        self.blocked_until = 0.0
+        self.changed_at = 0.0
+        self.outcomes = deque(maxlen=window)
+        self.cond = threading.Condition()
+
+
+class Ticket:
+    """One request's slot; call responded() once headers arrive so body streaming isn't counted as latency."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.first_byte = None
+
+    def responded(self):
+        self.first_byte = time.monotonic()
+
+    @property
+    def latency(self):
+        return (self.first_byte or time.monotonic()) - self.start
+
+
+class RateLimiter:
+    """
+    Shared throttle for everything that hits GeoOp: browser page loads, HTTP
+    job fetches and attachment downloads. Each host gets a token bucket
+    (rate per second, burst) that paces page and API requests, and a
+    concurrency limit shared by every request to it that adapts: it halves
+    when requests get throttled, fail with 5xx/timeouts more than
+    max_error_rate of the time, or the median latency passes slow_seconds,
+    and creeps back up by one while requests keep succeeding. A 429/503
+    pauses the whole host for its Retry-After. Attachment downloads take
+    slots with paced=False, so only the concurrency limit and Retry-After
+    hold them back, not the fixed rate.
+    """
+
+    def __init__(self, rate=5.0, burst=10, max_concurrency=8, min_concurrency=1,
+                 slow_seconds=15.0, max_error_rate=0.2, window=20, adjust_interval=5.0,
+                 base_delay=1.0, max_delay=60.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.slow_seconds = slow_seconds
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.adjust_interval = adjust_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def concurrency(self, url):
+        return self._host(url).limit
+
+    @contextmanager
+    def slot(self, url, paced=True):
+        """Wait for a free slot on url's host (and a token, if paced), and record how the request went."""
+        state = self._host(url)
+        self._acquire(state, paced)
+        ticket = Ticket()
+        try:
+            yield ticket
+        except Exception as e:
+            self._release(state, ticket, e)
+            raise
+        self._release(state, ticket, None)
+
+    def call(self, url, fn, attempts=3, retryable=is_retryable):
+        """Run fn() inside a slot for url, retrying retryable errors with backoff. Returns fn's result."""
+        for attempt in range(1, attempts + 1):
+            try:
+                with self.slot(url):
+                    return fn()
+            except Exception as e:
+                if attempt == attempts or not retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                print(f"⏳ {type(e).__name__} loading {url}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def backoff(self, attempt, error=None):
+        """Delay before retry number attempt: the server's Retry-After if given, else jittered exponential."""
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay) + random.uniform(0, self.base_delay)
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostState(self.rate, self.burst, self.max_concurrency, self.window)
+            return self._hosts[host]
+
+    def _acquire(self, state, paced=True):
+        with state.cond:
+            while True:
+                paused = state.blocked_until - time.monotonic()
+                if paused > 0:
+                    state.cond.wait(paused)
+                elif state.active >= state.limit:
+                    state.cond.wait()
+                else:
+                    break
+            state.active += 1
+            wait = state.bucket.reserve() if paced else 0.0
+        if wait:
+            time.sleep(wait)
+
+    def _release(self, state, ticket, error):
+        status = status_of(error)
+        if error is not None and status is not None and status not in RETRYABLE_STATUS:
+            # A 404 or 403 says nothing about how loaded the server is
+            error = None
+        throttled = status in THROTTLE_STATUS
+        now = time.monotonic()
+        with state.cond:
+            state.active -= 1
+            state.outcomes.append((error is None, ticket.latency))
+            if throttled:
+                pause = retry_after(error)
+                state.blocked_until = max(state.blocked_until, now + (pause if pause is not None else self.backoff(1)))
+            self._adjust(state, throttled, now)
+            state.cond.notify_all()
+
+    def _adjust(self, state, throttled, now):
+        if now - state.changed_at < self.adjust_interval:
+            return
+        outcomes = state.outcomes
+        error_rate = sum(1 for ok, _ in outcomes if not ok) / len(outcomes)
+        latencies = sorted(latency for _, latency in outcomes)
+        median = latencies[len(latencies) // 2]
+
+        # One failure out of two requests isn't a trend; an explicit 429/503 is
+        struggling = len(outcomes) >= self.window // 2 and (
+            error_rate > self.max_error_rate or median > self.slow_seconds
+        )
+        if throttled or struggling:
+            limit = max(self.min_concurrency, state.limit // 2)
+            if limit != state.limit:
+                print(f"🐢 Server is struggling (error rate {error_rate:.0%}, median {median:.1f}s); "
+                      f"dropping to {limit} concurrent request(s)")
+            state.limit = limit
+            state.changed_at = now
+            state.outcomes.clear()
+        elif len(outcomes) == outcomes.maxlen and state.limit < self.max_concurrency:
+            state.limit += 1
+            state.changed_at = now
@@ -0,0 +1,113 @@
+import time
+from contextlib import contextmanager
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+from utils.image_wait import wait_for_angular
+
+DEFAULT_TIMEOUTS = {"page_load": 20, "notes_tab": 20, "table_stable": 60}
+
+# Records the time of the last change to the note table (or the body until the
+# table exists). Re-installs itself if Angular swaps the table element out.
+INSTALL_TABLE_OBSERVER_JS = """
+var target = document.getElementById('noteTable') || document.body;
+if (window.__tableObserverTarget !== target) {
+    if (window.__tableObserver) { window.__tableObserver.disconnect(); }
+    window.__tableLastMutation = Date.now();
+    window.__tableObserver = new MutationObserver(function () {
+        window.__tableLastMutation = Date.now();
+    });
+    window.__tableObserver.observe(target, {childList: true, subtree: true});
+    window.__tableObserverTarget = target;
+}
+"""
+
+TABLE_QUIET_JS = """
+var quietMs = arguments[0];
+if (window.__tableLastMutation === undefined) { return false; }
+if (window.angular) {
+    var injector = angular.element(document.body).injector();
+    if (injector && injector.get('$http').pendingRequests.length > 0) { return false; }
+}
+return Date.now() - window.__tableLastMutation >= quietMs;
+"""
+
+# Restarts the quiet window too: the rows a scroll asks for only arrive after
+# the scroll handler (and Angular's debounce) has started the next request
+SCROLL_TO_BOTTOM_JS = """
+window.__tableLastMutation = Date.now();
+window.scrollTo(0, document.body.scrollHeight);
+return document.body.scrollHeight;
+"""
+
+
+class ReadinessWaiter:
+    """
+    Condition-based waits for the stages of a job page, replacing fixed sleeps.
+    A wait that times out only prints a warning so the job carries on, as it
+    did with the sleeps, unless the caller asks for the TimeoutException (e.g.
+    to retry the page load). Time spent in each stage is kept in self.timings.
+    """
+
+    def __init__(self, driver, timeouts=None, table_quiet_ms=750, poll_frequency=0.2):
+        self.driver = driver
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.table_quiet_ms = table_quiet_ms
+        self.poll_frequency = poll_frequency
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name, swallow=True):
+        start = time.monotonic()
+        try:
+            yield
+        except TimeoutException:
+            if not swallow:
+                raise
+            print(f"⚠️ Timed out waiting for {name} after {self.timeouts[name]}s; continuing")
+        finally:
+            self.timings[name] = round(self.timings.get(name, 0) + time.monotonic() - start, 3)
+
+    def page_ready(self, swallow=True):
+        """Wait for the document to finish loading and Angular to go idle; swallow=False raises on a timeout."""
+        with self.stage("page_load", swallow):
+            timeout = self.timeouts["page_load"]
+            WebDriverWait(self.driver, timeout, poll_frequency=self.poll_frequency).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            wait_for_angular(self.driver, timeout)
+
+    def notes_ready(self):
+        """Wait for the Notes & Documents tab to render its table."""
+        with self.stage("notes_tab"):
+            timeout = self.timeouts["notes_tab"]
+            wait_for_angular(self.driver, timeout)
+            WebDriverWait(self.driver, timeout, poll_frequency=self.poll_frequency).until(
+                EC.presence_of_element_located((By.ID, "noteTable"))
+            )
+
+    def table_stable(self, done=None):
+        """
+        Scroll to the bottom until the note table stops growing: each scroll
+        waits a full table_quiet_ms without DOM mutations, counted from the
+        scroll itself, and the loop ends once a scroll no longer changes the
+        page height, or once done() says the rows loaded so far are enough.
+        """
+        with self.stage("table_stable"):
+            deadline = time.monotonic() + self.timeouts["table_stable"]
+            while True:
+                self.driver.execute_script(INSTALL_TABLE_OBSERVER_JS)
+                height_before = self.driver.execute_script(SCROLL_TO_BOTTOM_JS)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutException()
+                WebDriverWait(self.driver, remaining, poll_frequency=self.poll_frequency).until(
+                    lambda d: d.execute_script(TABLE_QUIET_JS, self.table_quiet_ms)
+                )
+                if self.driver.execute_script("return document.body.scrollHeight") == height_before:
+                    break
+                if done is not None and done():
+                    break
@@ -0,0 +1,196 @@
+import json
+import sqlite3
+import threading
+import time
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attachments (
+    job_url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_url, path)
+);
+CREATE TABLE IF NOT EXISTS marks (
+    job_url TEXT PRIMARY KEY,
+    note_date TEXT NOT NULL,
+    row_keys TEXT NOT NULL,
+    undated_keys TEXT NOT NULL DEFAULT '[]',
+    next_index INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+class RunLedger:
+    """
+    SQLite record of every job and attachment the scraper has touched, so a
+    rerun can skip finished jobs and resume half-finished ones. Writes are
+    committed in batches of batch_size (or every flush_interval seconds)
+    rather than one transaction per update; call close() to flush the rest.
+    """
+
+    def __init__(self, path="run_ledger.db", batch_size=100, flush_interval=5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(marks)")}
+        if "undated_keys" not in columns:
+            # Ledgers written before undated rows were tracked
+            self._conn.execute("ALTER TABLE marks ADD COLUMN undated_keys TEXT NOT NULL DEFAULT '[]'")
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    # ---- jobs ----
+
+    def pending(self, urls):
+        """Return the URLs that have not been completed yet, in their original order."""
+        with self._lock:
+            done = {row[0] for row in self._conn.execute("SELECT url FROM jobs WHERE state = ?", (DONE,))}
+        return [url for url in urls if url not in done]
+
+    def is_done(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM jobs WHERE url = ?", (url,)).fetchone()
+        return row is not None and row[0] == DONE
+
+    def settled_since(self, urls, since):
+        """Return which of urls were finished or failed at or after the time.time() value since."""
+        urls = list(urls)
+        if not urls:
+            return set()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url FROM jobs WHERE state IN (?, ?) AND updated_at >= ? "
+                f"AND url IN ({', '.join('?' * len(urls))})",
+                (DONE, FAILED, since, *urls),
+            )
+            return {row[0] for row in rows}
+
+    def start_job(self, url):
+        self._write(
+            "INSERT INTO jobs (url, state, attempts, updated_at) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(url) DO UPDATE SET state = excluded.state, attempts = attempts + 1, "
+            "updated_at = excluded.updated_at",
+            (url, IN_PROGRESS, time.time()),
+        )
+
+    def finish_job(self, url):
+        self._set_job_state(url, DONE, None)
+
+    def fail_job(self, url, error):
+        self._set_job_state(url, FAILED, str(error))
+
+    def failed_jobs(self):
+        """Return (url, attempts, last_error) for every job whose last attempt failed."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT url, attempts, last_error FROM jobs WHERE state = ? ORDER BY updated_at", (FAILED,)
+            ).fetchall()
+
+    def _set_job_state(self, url, state, error):
+        self._write(
+            "INSERT INTO jobs (url, state, last_error, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET state = excluded.state, last_error = excluded.last_error, "
+            "updated_at = excluded.updated_at",
+            (url, state, error, time.time()),
+        )
+
+    # ---- attachments ----
+
+    def done_attachments(self, job_url):
+        """Return the output paths of a job's attachments that were already saved."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM attachments WHERE job_url = ? AND state = ?", (job_url, DONE)
+            )
+            return {row[0] for row in rows}
+
+    def start_attachment(self, job_url, url, path):
+        self._write(
+            "INSERT INTO attachments (job_url, path, url, state, attempts, updated_at) VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT(job_url, path) DO UPDATE SET url = excluded.url, state = excluded.state, "
+            "attempts = attempts + 1, updated_at = excluded.updated_at",
+            (job_url, path, url, IN_PROGRESS, time.time()),
+        )
+
+    def finish_attachment(self, job_url, path):
+        self._set_attachment_state(job_url, path, DONE, None)
+
+    def fail_attachment(self, job_url, path, error):
+        self._set_attachment_state(job_url, path, FAILED, str(error))
+
+    def _set_attachment_state(self, job_url, path, state, error):
+        self._write(
+            "UPDATE attachments SET state = ?, last_error = ?, updated_at = ? WHERE job_url = ? AND path = ?",
+            (state, error, time.time(), job_url, path),
+        )
+
+    # ---- high-water marks ----
+
+    def high_water_mark(self, job_url):
+        """The newest note already saved for a job (see utils.high_water), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT note_date, row_keys, undated_keys, next_index FROM marks WHERE job_url = ?", (job_url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "note_date": row[0],
+            "row_keys": json.loads(row[1]),
+            "undated_keys": json.loads(row[2]),
+            "next_index": row[3],
+        }
+
+    def set_high_water_mark(self, job_url, mark):
+        self._write(
+            "INSERT OR REPLACE INTO marks (job_url, note_date, row_keys, undated_keys, next_index, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_url, mark["note_date"], json.dumps(mark["row_keys"]), json.dumps(mark["undated_keys"]),
+             mark["next_index"], time.time()),
+        )
+
+    # ---- batching ----
+
+    def _write(self, sql, params):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._uncommitted += 1
+            if (self._uncommitted >= self.batch_size
+                    or time.monotonic() - self._last_commit >= self.flush_interval):
+                self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+
+from utils.http_session import is_login_page, session_from_cookies
+
+
+def cookie_key(cookie):
+    return (cookie.get("name"), cookie.get("value"), cookie.get("domain"), cookie.get("path", "/"))
+
+
+def to_cdp_cookie(cookie):
+    """Convert a Selenium cookie dict into the shape Network.setCookies expects."""
+    cdp = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain"),
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    if cookie.get("expiry"):
+        cdp["expires"] = cookie["expiry"]
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        cdp["sameSite"] = cookie["sameSite"]
+    return cdp
+
+
+class SessionManager:
+    """
+    Owns the GeoOp login cookies for the whole run. is_valid() drops expired
+    cookies locally and then confirms the rest with one request to check_url,
+    caching the answer so any number of browser or HTTP workers share a single
+    check. Cookies are only written back to cookies_file when they change.
+    """
+
+    def __init__(self, cookies_file="cookies.json", check_url=None, timeout=15):
+        self.cookies_file = cookies_file
+        self.check_url = check_url
+        self.timeout = timeout
+        self._cookies = self._read()
+        self._valid = None
+        self._lock = threading.Lock()
+
+    @property
+    def cookies(self):
+        return list(self._cookies)
+
+    def live_cookies(self):
+        """Saved cookies that have not passed their expiry; session cookies (no expiry) count as live."""
+        now = time.time()
+        return [c for c in self._cookies if not c.get("expiry") or c["expiry"] > now]
+
+    def is_valid(self):
+        """True if the saved cookies are still logged in; checked once and remembered until invalidate()."""
+        with self._lock:
+            if self._valid is None:
+                self._valid = self._check()
+            return self._valid
+
+    def invalidate(self):
+        """Forget the cached check, e.g. after a worker was bounced to the login page."""
+        with self._lock:
+            self._valid = None
+
+    def http_session(self):
+        """A new requests session carrying the saved cookies; one per HTTP worker."""
+        return session_from_cookies(self.live_cookies())
+
+    def apply_to_driver(self, driver, url):
+        """
+        Give a browser the saved cookies. Chrome takes them over CDP before any
+        page has loaded; other drivers have to visit url's domain first.
+        """
+        cookies = self.live_cookies()
+        if not cookies:
+            return
+        if hasattr(driver, "execute_cdp_cmd"):
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": [to_cdp_cookie(c) for c in cookies]})
+            return
+        driver.get(url)
+        for cookie in cookies:
+            driver.add_cookie(cookie)
+
+    def save_from_driver(self, driver):
+        """Store the browser's cookies after a login, rewriting the file only if they changed."""
+        cookies = driver.get_cookies()
+        with self._lock:
+            self._valid = True
+            if {cookie_key(c) for c in cookies} == {cookie_key(c) for c in self._cookies}:
+                return
+            self._cookies = cookies
+        with open(self.cookies_file, "w") as f:
+            json.dump(cookies, f, indent=2)
+        print("✅ Cookies saved to JSON!")
+
+    def _read(self):
+        if not os.path.exists(self.cookies_file):
+            return []
+        try:
+            with open(self.cookies_file, "r") as f:
+                return json.load(f)
+        except ValueError:
+            print(f"⚠️ {self.cookies_file} is not valid JSON; logging in from scratch")
+            return []
+
+    def _check(self):
+        if not self.live_cookies():
+            print("🔒 No unexpired saved cookies")
+            return False
+        if not self.check_url:
+            return True
+        session = self.http_session()
+        try:
+            response = session.get(self.check_url, timeout=self.timeout)
+        except Exception as e:
+            print(f"⚠️ Could not check the saved session: {e}")
+            return False
+        finally:
+            session.close()
+        valid = not is_login_page(response) and response.ok
+        print("✅ Saved session is still valid" if valid else "🔒 Saved session has expired")
+        return valid
@@ -0,0 +1,132 @@
+# utils/snapshots.py
+# Rendered job pages saved by `scraper.py --capture-snapshots`, one gzipped
+# JSON file per job, and a replay that runs the HTML parser over all of them
+# without a browser:
+#
+#   python -m utils.snapshots replay                 # parse every snapshot, report differences
+#   python -m utils.snapshots replay --out jobs.jsonl --workers 8
+#
+# Each snapshot also keeps what the browser extracted at capture time, so
+# replay doubles as a regression check: a parser change that no longer
+# matches the live extraction is listed with the fields that differ.
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pages.job_html import parse_job_pages
+
+JOB_FIELDS = ("client_name", "service_name", "job_id", "visit_text", "rows")
+
+
+def snapshot_path(folder, job_url):
+    return os.path.join(folder, f"{hashlib.sha1(job_url.encode('utf-8')).hexdigest()[:16]}.json.gz")
+
+
+def save_snapshot(folder, job_url, pages, job):
+    """Write a job's captured pages ({"job": html, "notes": html}) and the browser's extraction of them."""
+    os.makedirs(folder, exist_ok=True)
+    path = snapshot_path(folder, job_url)
+    snapshot = {
+        "url": job_url,
+        "captured_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "pages": pages,
+        "job": {field: job.get(field) for field in JOB_FIELDS},
+    }
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _normalise(value):
+    """Compare text the way it reads: the browser and the parser join whitespace differently."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, list):
+        return [_normalise(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalise(item) for key, item in value.items()}
+    return value
+
+
+def replay_snapshot(path):
+    """Parse one snapshot; returns (url, job, differing fields, parse milliseconds). Runs in a worker process."""
+    snapshot = load_snapshot(path)
+    start = time.perf_counter()
+    job = parse_job_pages(snapshot["pages"]["job"], snapshot["pages"]["notes"])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    job["url"] = snapshot["url"]
+    captured = snapshot.get("job") or {}
+    differences = [
+        field for field in JOB_FIELDS
+        if field in captured and _normalise(job[field]) != _normalise(captured[field])
+    ]
+    return snapshot["url"], job, differences, elapsed_ms
+
+
+def snapshot_files(folder):
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".json.gz")
+    )
+
+
+def replay(folder, workers=None, out=None):
+    """Re-run the parser over every snapshot in folder; returns the number that differ from the capture."""
+    paths = snapshot_files(folder)
+    start = time.monotonic()
+    differing = 0
+    parse_ms = []
+    out_file = open(out, "w") if out else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for url, job, differences, elapsed_ms in pool.map(replay_snapshot, paths, chunksize=16):
+                parse_ms.append(elapsed_ms)
+                if differences:
+                    differing += 1
+                    print(f"❌ {url}: doesn't match the captured extraction in {', '.join(differences)}")
+                if out_file is not None:
+                    out_file.write(json.dumps(job) + "\n")
+    finally:
+        if out_file is not None:
+            out_file.close()
+    elapsed = time.monotonic() - start
+    average = sum(parse_ms) / len(parse_ms) if parse_ms else 0
+    print(f"🔁 Replayed {len(paths)} snapshot(s) in {elapsed:.1f}s ({average:.1f} ms parse per job), "
+          f"{differing} differing")
+    return differing
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay the job page parser over captured snapshots.")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("--folder", default=None, help="snapshot folder (default: SNAPSHOT_FOLDER)")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: one per CPU)")
+    parser.add_argument("--out", help="write each re-parsed job as a JSON line to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    folder = args.folder
+    if folder is None:
+        import config_geoop
+        folder = config_geoop.SNAPSHOT_FOLDER
+    if not os.path.isdir(folder):
+        sys.exit(f"No snapshots in {folder}; capture some with `python scraper.py --capture-snapshots`")
+    differing = replay(folder, workers=args.workers, out=args.out)
+    sys.exit(1 if differing else 0)
+
+
+if __name__ == "__main__":
+    main()
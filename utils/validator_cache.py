@@ -0,0 +1,53 @@
+import sqlite3
+import threading
+import time
+
+from utils.content_store import url_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validators (
+    url_key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+class ValidatorCache:
+    """
+    Remembers, per attachment URL (signed query string stripped, as in the
+    content store), the ETag, Last-Modified, size and local path of the last
+    copy saved, so a later fetch can ask the server whether it has changed.
+    """
+
+    def __init__(self, path="validator_cache.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """The stored validators for url as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, size, path FROM validators WHERE url_key = ?", (url_key(url),)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def put(self, url, path, size, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO validators (url_key, etag, last_modified, size, path, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url_key(url), etag, last_modified, size, path, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,285 @@
+# utils/work_queue.py
+# Shared job queue for running the scraper on several machines at once. The
+# queue is a SQLite file on storage every node can reach; each scraper leases
+# a few jobs at a time, renews its leases while it works, and marks them done
+# or failed. A node that dies simply stops renewing, and its jobs are leased
+# again by the others once the lease runs out.
+#
+#   python -m utils.work_queue load job_urls.txt       # or "-" to read stdin
+#   python scraper.py --queue --workers 4              # on each node
+#   python -m utils.work_queue status
+#   python -m utils.work_queue requeue --watch 60      # hand dead nodes' jobs back out
+import argparse
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from itertools import islice
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queue_state ON queue (state, lease_until);
+"""
+
+
+def read_urls(path):
+    """Yield job URLs from a file (or stdin for "-") one line at a time, skipping blanks and # comments."""
+    f = sys.stdin if path == "-" else open(path, "r")
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class WorkQueue:
+    """
+    Jobs in a SQLite file shared between nodes. Every change runs in its own
+    BEGIN IMMEDIATE transaction, so the file lock keeps two nodes from leasing
+    the same job. The default rollback journal is kept because WAL mode
+    doesn't work over network filesystems.
+
+    A lease lasts lease_seconds; start_heartbeat() keeps this worker's leases
+    renewed. A job failing max_attempts times is left as failed.
+    """
+
+    def __init__(self, path="work_queue.db", lease_seconds=900, max_attempts=3, worker_id=None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._stopping = threading.Event()
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    # ---- coordinator ----
+
+    def add(self, urls, batch_size=1000):
+        """Queue URLs from any iterable, batch_size at a time; ones already queued are left alone."""
+        urls = iter(urls)
+        added = 0
+        while True:
+            batch = list(islice(urls, batch_size))
+            if not batch:
+                return added
+            now = time.time()
+            added += self._transaction(lambda conn: conn.executemany(
+                "INSERT OR IGNORE INTO queue (url, state, updated_at) VALUES (?, ?, ?)",
+                [(url, PENDING, now) for url in batch],
+            ).rowcount)
+
+    def requeue_expired(self):
+        """Put jobs whose lease ran out back to pending; returns how many."""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE queue SET state = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE state = ? AND lease_until < ?",
+            (PENDING, time.time(), LEASED, time.time()),
+        ).rowcount)
+
+    def retry_failed(self):
+        """Give every failed job another max_attempts tries."""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE queue SET state = ?, attempts = 0, updated_at = ? WHERE state = ?",
+            (PENDING, time.time(), FAILED),
+        ).rowcount)
+
+    def counts(self):
+        """Number of jobs in each state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def workers(self):
+        """(worker, leased jobs, latest lease expiry) for every worker holding leases."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT worker, COUNT(*), MAX(lease_until) FROM queue WHERE state = ? GROUP BY worker ORDER BY worker",
+                (LEASED,),
+            ).fetchall()
+
+    # ---- workers ----
+
+    def lease(self, count=1):
+        """Lease up to count pending (or expired) jobs to this worker and return their URLs."""
+        def take(conn):
+            now = time.time()
+            urls = [row[0] for row in conn.execute(
+                "SELECT url FROM queue WHERE state = ? OR (state = ? AND lease_until < ?) LIMIT ?",
+                (PENDING, LEASED, now, count),
+            )]
+            conn.executemany(
+                "UPDATE queue SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE url = ?",
+                [(LEASED, self.worker_id, now + self.lease_seconds, now, url) for url in urls],
+            )
+            return urls
+        return self._transaction(take)
+
+    def renew(self):
+        """Extend every lease this worker holds."""
+        now = time.time()
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE queue SET lease_until = ?, updated_at = ? WHERE state = ? AND worker = ?",
+            (now + self.lease_seconds, now, LEASED, self.worker_id),
+        ).rowcount)
+
+    def complete(self, url):
+        # Unless another worker has leased it since this worker's lease ran out
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE queue SET state = ?, worker = NULL, lease_until = NULL, last_error = NULL, updated_at = ? "
+            "WHERE url = ? AND (worker = ? OR state = ?)",
+            (DONE, time.time(), url, self.worker_id, PENDING),
+        ))
+
+    def fail(self, url, error):
+        """Record a failed attempt; the job goes back to pending unless it is out of attempts."""
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE queue SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, "
+            "lease_until = NULL, last_error = ?, updated_at = ? WHERE url = ? AND worker = ?",
+            (self.max_attempts, FAILED, PENDING, str(error), time.time(), url, self.worker_id),
+        ))
+
+    def iter_leased(self, batch=1, poll_seconds=10):
+        """
+        Yield job URLs as they are leased, until nothing is pending or leased
+        anywhere. While other workers still hold leases this keeps polling, in
+        case one of them dies and its jobs come back.
+        """
+        while not self._stopping.is_set():
+            urls = self.lease(batch)
+            if urls:
+                yield from urls
+                continue
+            counts = self.counts()
+            if not counts.get(PENDING) and not counts.get(LEASED):
+                return
+            self._stopping.wait(poll_seconds)
+
+    def start_heartbeat(self, interval=None):
+        """Renew this worker's leases in the background every third of a lease."""
+        interval = interval or self.lease_seconds / 3
+
+        def beat():
+            while not self._stopping.wait(interval):
+                try:
+                    self.renew()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not renew job leases: {e}")
+
+        self._heartbeat = threading.Thread(target=beat, name="queue-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def close(self):
+        self._stopping.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        with self._lock:
+            self._conn.close()
+
+
+class QueuedLedger:
+    """
+    The run ledger of a queue worker: everything goes to the local ledger as
+    usual, and each job's outcome is also reported to the shared queue.
+    """
+
+    def __init__(self, ledger, work_queue):
+        self.ledger = ledger
+        self.work_queue = work_queue
+
+    def __getattr__(self, name):
+        return getattr(self.ledger, name)
+
+    def finish_job(self, url):
+        self.ledger.finish_job(url)
+        self.work_queue.complete(url)
+
+    def fail_job(self, url, error):
+        self.ledger.fail_job(url, error)
+        self.work_queue.fail(url, error)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load and watch the shared job queue for multi-node runs.")
+    parser.add_argument("--queue", default=None, help="queue file (default: WORK_QUEUE_FILE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="queue job URLs, one per line")
+    load.add_argument("files", nargs="+", help='files of job URLs, or "-" for stdin')
+    commands.add_parser("status", help="show job counts and the workers holding leases")
+    requeue = commands.add_parser("requeue", help="hand jobs with expired leases back out")
+    requeue.add_argument("--watch", type=float, metavar="SECONDS", help="keep doing so every SECONDS")
+    requeue.add_argument("--failed", action="store_true", help="also retry jobs that ran out of attempts")
+    return parser.parse_args()
+
+
+def print_status(work_queue):
+    counts = work_queue.counts()
+    print("  ".join(f"{state}={counts.get(state, 0)}" for state in (PENDING, LEASED, DONE, FAILED)))
+    now = time.time()
+    for worker, leased, lease_until in work_queue.workers():
+        print(f"  {worker}: {leased} leased, lease ends in {lease_until - now:.0f}s")
+
+
+def main():
+    import config_geoop
+
+    args = parse_args()
+    work_queue = WorkQueue(args.queue or config_geoop.WORK_QUEUE_FILE)
+    try:
+        if args.command == "load":
+            for path in args.files:
+                added = work_queue.add(read_urls(path))
+                print(f"📥 Queued {added} new job(s) from {path}")
+            print_status(work_queue)
+        elif args.command == "status":
+            print_status(work_queue)
+        else:
+            if args.failed:
+                print(f"🔁 {work_queue.retry_failed()} failed job(s) queued again")
+            while True:
+                requeued = work_queue.requeue_expired()
+                if requeued:
+                    print(f"🔁 {requeued} job(s) from dead workers queued again")
+                print_status(work_queue)
+                if not args.watch:
+                    break
+                time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        work_queue.close()
+
+
+if __name__ == "__main__":
+    main()
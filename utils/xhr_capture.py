@@ -0,0 +1,132 @@
+import json
+from datetime import datetime
+from fnmatch import fnmatch
+
+# Chrome's DevTools resource types for requests made by page scripts
+XHR_TYPES = {"XHR", "Fetch"}
+
+
+def enable_performance_log(options):
+    """Have chromedriver record DevTools network events, read back with driver.get_log("performance")."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def json_path(data, path):
+    """Follow a dotted path like "client.name" or "visits.0.start" into parsed JSON; None if it isn't there."""
+    for key in path.split("."):
+        if isinstance(data, list) and key.isdigit() and int(key) < len(data):
+            data = data[int(key)]
+        elif isinstance(data, dict) and key in data:
+            data = data[key]
+        else:
+            return None
+    return data
+
+
+def geoop_date(value, fmt, tz=None):
+    """
+    The page shows dates like "01 Mar 2024 10:04 am" in the account's local
+    time, and folder names, the attachment index and high-water marks are
+    built from that; ISO timestamps from the API are converted to tz (this
+    machine's zone if None) and rewritten into the same form. Timestamps
+    without an offset are taken as local already. Anything else is passed
+    through.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(tz)
+    return parsed.strftime(fmt).replace("AM", "am").replace("PM", "pm")
+
+
+class XhrCapture:
+    """
+    Reads the JSON responses the GeoOp Angular app fetches, from the driver's
+    performance log, instead of waiting for them to be rendered. patterns
+    maps a name to a wildcard URL pattern (as in BLOCKED_URL_PATTERNS); a
+    response is filed under the first name whose pattern it matches.
+    The driver must have been started with enable_performance_log().
+    """
+
+    def __init__(self, driver, patterns):
+        self.driver = driver
+        self.patterns = patterns
+        self._pending = {}
+
+    def clear(self):
+        """Drop the events logged so far, e.g. the previous job's."""
+        self.driver.get_log("performance")
+        self._pending = {}
+
+    def responses(self):
+        """Parsed JSON bodies of the matching responses logged since the last call, by pattern name."""
+        found = {}
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            params = message.get("params", {})
+            if message["method"] == "Network.responseReceived" and params.get("type") in XHR_TYPES:
+                response = params["response"]
+                name = self._match(response["url"])
+                if name is not None and response["status"] == 200:
+                    self._pending[params["requestId"]] = name
+            elif message["method"] == "Network.loadingFinished" and params["requestId"] in self._pending:
+                name = self._pending.pop(params["requestId"])
+                body = self._body(params["requestId"])
+                if body is not None:
+                    found[name] = body
+        return found
+
+    def _match(self, url):
+        for name, pattern in self.patterns.items():
+            if fnmatch(url, pattern):
+                return name
+        return None
+
+    def _body(self, request_id):
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            return json.loads(result["body"])
+        except Exception:
+            # Evicted from Chrome's buffer, or not JSON after all
+            return None
+
+
+def job_from_responses(responses, api, tz=None):
+    """
+    Build the job dict extract_job returns from the captured "job" and
+    "notes" responses, using the paths in api (see XHR_API in the config),
+    with times shown in tz as geoop_date() does.
+    Returns None if anything is missing, including notes the API says
+    exist but that weren't in the response, so the caller can fall back.
+    """
+    if "job" not in responses or "notes" not in responses:
+        return None
+    details, notes = responses["job"], responses["notes"]
+    fields = api["job"]
+    records = json_path(notes, api["notes"])
+    if not isinstance(records, list):
+        return None
+    total = json_path(notes, api["notes_total"]) if api.get("notes_total") else None
+    if isinstance(total, int) and total > len(records):
+        return None
+
+    rows = []
+    for record in records:
+        row = {key: json_path(record, path) if path else None for key, path in api["row"].items()}
+        row["date"] = geoop_date(row["date"], "%d %b %Y %I:%M %p", tz)
+        rows.append(row)
+
+    job_id = json_path(details, fields["job_id"])
+    if job_id is None:
+        return None
+    return {
+        "client_name": json_path(details, fields["client_name"]) or "",
+        "service_name": json_path(details, fields["service_name"]) or "",
+        "job_id": str(job_id),
+        "visit_text": geoop_date(json_path(details, fields["visit_text"]), "%d %b %H:%M", tz) or "",
+        "rows": rows,
+    }